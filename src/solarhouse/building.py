@@ -1,4 +1,8 @@
+import copy
+import hashlib
 import math
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
@@ -9,6 +13,11 @@ from pvlib.temperature import TEMPERATURE_MODEL_PARAMETERS
 from trimesh import geometry, load, triangles
 
 from . import settings
+from .irradiance import calc_power_on_faces, get_solar_position, group_orientations, set_default_weather
+from .mesh_cache import default_mesh_cache
+from .mesh_offset import offset_mesh
+from .shading import Shading
+from .solar_cache import default_cache
 
 temp_model_pars = TEMPERATURE_MODEL_PARAMETERS["sapm"]["open_rack_glass_glass"]
 
@@ -16,6 +25,9 @@ properties_materials = {
     "adobe": {"transcalency": 0.04, "heat_capacity": 450.0, "density": 450.0},
     "water": {"transcalency": 0.599, "heat_capacity": 4182, "density": 998.29},
     "birch": {"transcalency": 0.15, "heat_capacity": 1250.0, "density": 700.0},
+    "brick": {"transcalency": 0.7, "heat_capacity": 880.0, "density": 1800.0},
+    "mineral_wool": {"transcalency": 0.04, "heat_capacity": 840.0, "density": 50.0},
+    "plaster": {"transcalency": 0.8, "heat_capacity": 840.0, "density": 1600.0},
 }
 
 
@@ -105,6 +117,40 @@ class Building:
         "fl_out",
     ]
 
+    stage_dependencies = {
+        "power_data": (
+            "mesh",
+            "location",
+            "weather_data",
+            "efficiency",
+            "irradiance_engine",
+            "group_orientations",
+            "orientation_tolerance",
+            "power_by_faces",
+            "aggregate_only",
+            "compact_power",
+            "power_dtype",
+            "shading",
+            "shading_bin",
+        ),
+        "mesh_file": ("mesh",),
+        "mesh_inside": ("mesh", "wall_thickness", "inside_method", "inside_resolution"),
+        "face_orientations": ("mesh",),
+        "shading": ("mesh", "shading_bin"),
+        "geometry": (
+            "mesh",
+            "wall_thickness",
+            "windows",
+            "floor",
+            "heat_accumulator",
+            "material",
+            "dict_properties_materials",
+            "floor_tolerance",
+            "inside_method",
+            "inside_resolution",
+        ),
+    }
+
     def __init__(
         self,
         mesh_file: str,
@@ -119,10 +165,18 @@ class Building:
         **kwargs
     ) -> None:
         """ Initialize object of class Building. """
-        self.mesh = load(mesh_file)
         self.__mesh_inside = None
-        if not self.mesh.is_watertight:
-            raise Exception("Mesh is not watertight", "Error")
+        self.__face_orientations = None
+        self.__shading = None
+        self.__pool = None
+        self.__geometry = {}
+        self.__stage_keys = {}
+        self.mesh_cache = kwargs.get("mesh_cache", default_mesh_cache)
+        self.mesh_key = self.mesh_cache.get_key(mesh_file) if self.mesh_cache is not None else None
+        if self.mesh_cache is not None:
+            self.mesh = self.mesh_cache.get_mesh(self.mesh_key, lambda: self.__load_mesh(mesh_file))
+        else:
+            self.mesh = self.__load_mesh(mesh_file)
         self.material = wall_material
         self.wall_thickness = wall_thickness
         self.current_temp = start_temp_in
@@ -132,6 +186,8 @@ class Building:
         self.cover_material = cover_material
         self.dict_properties_materials = properties_materials
         self.wall_layers = kwargs.get("wall_layers", None)
+        if self.wall_layers:
+            self.wall_thickness = sum(layer["thickness"] for layer in self.wall_layers)
         self.dict_power_inside = kwargs.get("dict_power_inside", None)
         self.dict_properties_materials = kwargs.get("properties_materials", properties_materials)
         self.ventilation_losses = kwargs.get("ventilation_losses", 0)
@@ -140,14 +196,35 @@ class Building:
         self.floor = kwargs.get("floor", {"material": self.material, "therm_r": 0, "area": 0, "layers": []})
         self.ceiling = kwargs.get("ceiling", {"material": self.material, "therm_r": 0, "area": 0, "layers": []},)
         self.extra_losses = kwargs.get("extra_losses", {})
-
-        self.__centring()
+        self.irradiance_engine = kwargs.get("irradiance_engine", "modelchain")
+        self.count_faces_for_parallel_calc = kwargs.get(
+            "count_faces_for_parallel_calc", settings.COUNT_FACES_FOR_PARALLEL_CALC
+        )
+        self.count_workers = kwargs.get("count_workers", settings.COUNT_WORKERS_FOR_PARALLEL_CALC)
+        self.group_orientations = kwargs.get("group_orientations", False)
+        self.orientation_tolerance = kwargs.get("orientation_tolerance", 0.0)
+        self.power_by_faces = kwargs.get("power_by_faces", False)
+        self.floor_tolerance = kwargs.get("floor_tolerance", settings.FLOOR_TILT_TOLERANCE)
+        self.inside_method = kwargs.get("inside_method", "scale")
+        self.inside_resolution = kwargs.get("inside_resolution", None)
+        self.shading = kwargs.get("shading", False)
+        self.shading_bin = kwargs.get("shading_bin", settings.SHADING_BIN_SIZE)
+        self.solar_cache = kwargs.get("solar_cache", default_cache)
+        self.aggregate_only = kwargs.get("aggregate_only", False)
+        self.compact_power = kwargs.get("compact_power", False)
+        self.power_dtype = kwargs.get("power_dtype", "float32")
+        self.power_path = kwargs.get("power_path", None)
 
         self.__correct_wall_thickness()
+        if self.mesh_cache is not None:
+            self.mark_actual("mesh_file")
 
         self.weather_data = {}
         self.power_data = {}
         self.power_data_by_days = None
+        self.power_groups = None
+        self.face_groups = None
+        self.power_faces = None
         self.location = Location(latitude=geo["latitude"], longitude=geo["longitude"],)
         self.pv = PVSystem(
             surface_tilt=45,
@@ -159,6 +236,139 @@ class Building:
         self.mc = ModelChain(self.pv, self.location, aoi_model="no_loss", spectral_model="no_loss")
         return
 
+    def copy(self, **params):
+        """
+        Get copy of the building with changed parameters.
+        Copy shares mesh, weather data and power of sun on faces
+        with this building, so they are not loaded and calculated again.
+        Names of parameters are names of arguments of Building,
+        dict parameters (windows, floor, ceiling, heat_accumulator)
+        update dict of the building.
+        Power of sun is rescaled if efficiency is changed.
+
+        :param params: changed parameters of building
+        :return: Building
+        """
+        power_is_actual = self.is_actual("power_data")
+        other = copy.copy(self)
+        other.__stage_keys = dict(self.__stage_keys)
+        for name in ("heat_accumulator", "windows", "floor", "ceiling", "extra_losses"):
+            setattr(other, name, copy.deepcopy(getattr(self, name)))
+        for name, value in params.items():
+            if name == "wall_material":
+                name = "material"
+            current = getattr(other, name)
+            if isinstance(current, dict) and isinstance(value, dict):
+                current.update(value)
+            else:
+                setattr(other, name, value)
+        if params.get("wall_layers"):
+            other.wall_thickness = sum(layer["thickness"] for layer in other.wall_layers)
+        other.__mesh_inside = None
+        other.__geometry = {}
+        other.__correct_wall_thickness()
+        if other.efficiency != self.efficiency and len(self.power_data):
+            k = other.efficiency / self.efficiency
+            other.power_data = self.power_data.copy()
+            fields = [name for name in other.power_data if name != "ind_face"]
+            other.power_data[fields] = other.power_data[fields] * k
+            other.power_data_by_days = other.power_data["sum_solar_power"].resample("1D").mean()
+            if self.power_groups is not None:
+                other.power_groups = self.power_groups * k
+            if self.power_faces is not None:
+                other.power_faces = np.asarray(self.power_faces * k, dtype=self.power_dtype)
+            if power_is_actual:
+                other.mark_actual("power_data")
+        return other
+
+    def get_fingerprint(self, name: str) -> bytes:
+        """
+        Get fingerprint of value of attribute for tracking of its changes.
+        Fingerprint of the mesh is hash of its data, trimesh keeps it
+        until vertices or faces are changed, so it is not calculated
+        on every call. Power of sun depends only on irradiance columns,
+        temperature of air and pressure of weather data.
+
+        :param name: name of attribute
+        :return: bytes of fingerprint
+        """
+        value = getattr(self, name)
+        if name == "mesh":
+            return repr(hash(value)).encode()
+        if name == "location":
+            return repr((value.latitude, value.longitude, value.altitude, str(value.tz))).encode()
+        if name == "weather_data":
+            if not len(value):
+                return b""
+            data = value.reindex(columns=[c for c in ("ghi", "dni", "dhi", "temp_air", "pressure") if c in value])
+            if "temp_air" not in value:
+                # the same as default temperature of set_default_weather
+                data.insert(min(3, len(data.columns)), "temp_air", 20.0)
+            return value.index.asi8.tobytes() + repr(list(data.columns)).encode() + data.values.tobytes()
+        return repr(value).encode()
+
+    def get_stage_key(self, stage: str) -> str:
+        """
+        Get key of values of attributes which derived data of stage depends on.
+
+        :param stage: name of stage from stage_dependencies
+        :return: string of key
+        """
+        sha = hashlib.sha1()
+        for name in self.stage_dependencies[stage]:
+            sha.update(name.encode())
+            sha.update(self.get_fingerprint(name))
+        return sha.hexdigest()
+
+    def is_actual(self, stage: str) -> bool:
+        """Check that data of stage is calculated for current values of attributes."""
+        return self.__stage_keys.get(stage) == self.get_stage_key(stage)
+
+    def mark_actual(self, stage: str) -> None:
+        """Mark data of stage as calculated for current values of attributes."""
+        self.__stage_keys[stage] = self.get_stage_key(stage)
+
+    def get_geometry(self, name: str, calc):
+        """
+        Get geometric property from the cache or calculate it.
+        All cached properties are calculated again after changes of
+        mesh, wall thickness, windows, floor, heat accumulator or
+        properties of materials (volume of heat accumulator can be
+        calculated by density of its material).
+
+        :param name: name of property
+        :param calc: function which calculates property
+        :return: value of property
+        """
+        if not self.is_actual("geometry"):
+            self.invalidate_geometry()
+            self.mark_actual("geometry")
+        if name not in self.__geometry:
+            self.__geometry[name] = calc()
+        return self.__geometry[name]
+
+    def invalidate_geometry(self) -> None:
+        """Remove all cached geometric properties, e.g. after changes of the mesh in place."""
+        self.__geometry = {}
+        self.__mesh_inside = None
+
+    def update_sun_power(self) -> bool:
+        """
+        Calculates power of sun on faces only if mesh, location, weather
+        data, efficiency or settings of calculation of power are changed
+        since last calculation. Changes of thermal parameters
+        (windows, floor, heat accumulator, etc.) do not need it.
+
+        :return: True if power of sun was calculated again
+        """
+        if len(self.power_data) and self.is_actual("power_data"):
+            set_default_weather(self.weather_data)
+            return False
+        key = self.get_stage_key("power_data")
+        self.calc_sun_power_on_faces()
+        self.__stage_keys["power_data"] = key
+        return True
+
     def __correct_wall_thickness(self) -> None:
         """ Method for correct the wall thickness. """
         for base in self.mesh.bounding_box.primitive.extents:
@@ -167,6 +377,19 @@ class Building:
                 self.wall_thickness = min(self.mesh.bounding_box.primitive.extents) / 2
         return
 
+    def __load_mesh(self, mesh_file: str):
+        """
+        Load the mesh from file, check and centre it.
+
+        :param mesh_file: path of file of the mesh
+        :return: trimesh.Trimesh
+        """
+        self.mesh = load(mesh_file)
+        if not self.mesh.is_watertight:
+            raise Exception("Mesh is not watertight", "Error")
+        self.__centring()
+        return self.mesh
+
     def __centring(self):
         """ Method for centring of the mesh. """
         where_move = self.mesh.center_mass * -1.0
@@ -179,22 +402,51 @@ class Building:
 
     @property
     def mesh_inside(self):
-        """Get mesh of inside walls and floor of the house"""
-        factors = []
-        if self.__mesh_inside:
+        """
+        Get mesh of inside walls and floor of the house.
+        If the mesh is not changed since loading, inside mesh is taken
+        from the cache of meshes, so it is calculated once for the same
+        file of the mesh, thickness of walls and method.
+        """
+        if self.__mesh_inside and self.is_actual("mesh_inside"):
             return self.__mesh_inside
+        self.mark_actual("mesh_inside")
+        if self.mesh_cache is not None and self.is_actual("mesh_file"):
+            self.__mesh_inside = self.mesh_cache.get_inside(
+                self.mesh_key, self.wall_thickness, self.calc_mesh_inside, self.inside_method, self.inside_resolution
+            )
+        else:
+            self.__mesh_inside = self.calc_mesh_inside()
+        return self.__mesh_inside
+
+    def calc_mesh_inside(self):
+        """
+        Calculates mesh of inside walls and floor of the house.
+        With inside_method "scale" the mesh is scaled by factors of extents
+        of its bounding box, it is correct only for boxes.
+        With inside_method "offset" faces of the mesh are moved inward by
+        thickness of walls (see offset_mesh), inside_resolution is maximum
+        length of edges of faces before offset (meters).
+
+        :return: trimesh.Trimesh
+        """
+        if self.inside_method == "offset":
+            return offset_mesh(self.mesh, self.wall_thickness, max_edge=self.inside_resolution)
+        factors = []
         for base in self.mesh.bounding_box.primitive.extents:
             scale_factor = (base - self.wall_thickness * 2) / base
             factors.append(scale_factor)
         if factors != [0.0, 0.0, 0.0]:
             matrix = np.diag(factors + [1.0])
-            self.__mesh_inside = self.mesh.copy().apply_transform(matrix)
-        return self.__mesh_inside
+            return self.mesh.copy().apply_transform(matrix)
+        return None
 
     @property
     def walls_area_inside(self):
         """Calculates area of walls inside the house"""
-        area = self.mesh_inside.area - self.windows["area"] - self.floor_area_inside
+        area = self.get_geometry(
+            "walls_area_inside", lambda: self.mesh_inside.area - self.windows["area"] - self.floor_area_inside
+        )
         if area < 0:
             raise Exception("Area is null")
         return area
@@ -202,11 +454,57 @@ class Building:
     @property
     def walls_area_outside(self):
         """Calculates area of walls outside the house"""
-        area = self.mesh.area - self.windows["area"] - self.floor_area_outside
+        area = self.get_geometry(
+            "walls_area_outside", lambda: self.mesh.area - self.windows["area"] - self.floor_area_outside
+        )
         if area < 0:
             raise Exception("Area is null")
         return area
 
+    @property
+    def face_orientations(self) -> pd.DataFrame:
+        """
+        Get table of orientations of faces of the mesh.
+        Table is calculated for all faces at once and cached
+        until the mesh is changed.
+
+        :return: pd.DataFrame with row for every face,
+            Column names are: ``area, normal_x, normal_y, normal_z, tilt, azimuth``
+        """
+        if self.__face_orientations is None or not self.is_actual("face_orientations"):
+            self.__face_orientations = self.calc_face_orientations()
+            self.mark_actual("face_orientations")
+        return self.__face_orientations
+
+    def calc_face_orientations(self) -> pd.DataFrame:
+        """
+        Calculates area, normal, tilt and azimuth of all faces of the mesh
+        by arrays of triangles, the same way as get_face_orientation
+        does it for one face.
+
+        :return: pd.DataFrame with row for every face
+        """
+        crosses = triangles.cross(self.mesh.triangles)
+        areas = triangles.area(crosses=crosses)
+        unit, valid = triangles.normals(crosses=crosses)
+        normals = np.zeros((len(areas), 3))
+        normals[valid] = unit
+        up = np.tile((0.0, 0.0, 1.0), (len(areas), 1))
+        north = np.tile((0.0, 1.0, 0.0), (len(areas), 1))
+        tilts = geometry.vector_angle(np.stack([normals, up], axis=1))
+        projections = normals - normals[:, 2:3] * up
+        azimuths = geometry.vector_angle(np.stack([projections, north], axis=1))
+        return pd.DataFrame(
+            {
+                "area": areas,
+                "normal_x": normals[:, 0],
+                "normal_y": normals[:, 1],
+                "normal_z": normals[:, 2],
+                "tilt": tilts,
+                "azimuth": azimuths,
+            }
+        )
+
     @property
     def face_normals(self) -> list:
         return self.mesh.face_normals
@@ -218,11 +516,13 @@ class Building:
     @property
     def volume_air_inside(self) -> float:
         """Calculates volume of the air inside the house"""
-        return self.mesh_inside.volume - self.heat_accumulator_volume
+        return self.get_geometry("volume_air_inside", lambda: self.mesh_inside.volume - self.heat_accumulator_volume)
 
     @property
     def floor_thickness(self) -> float:
         """Get floor thickness"""
+        if self.floor.get("layers"):
+            return sum(layer["thickness"] for layer in self.floor["layers"])
         if "thickness" in self.floor and self.floor["thickness"]:
             return self.floor["thickness"]
         return self.wall_thickness
@@ -242,14 +542,19 @@ class Building:
         inside the house."""
         if not self.heat_accumulator:
             return 0
-        p = self.get_perimeter_floor("inside")
-        h = self.heat_accumulator_volume / self.floor_area_inside
-        return p * h
+        return self.get_geometry(
+            "area_mass_walls_inside",
+            lambda: self.get_perimeter_floor("inside") * self.heat_accumulator_volume / self.floor_area_inside,
+        )
 
     @property
     def area_mass_walls_outside(self) -> float:
         """Calculates area of the walls around the heat accumulator outside
          the house."""
+        return self.get_geometry("area_mass_walls_outside", self.calc_area_mass_walls_outside)
+
+    def calc_area_mass_walls_outside(self) -> float:
+        """Calculates area of the walls around the heat accumulator outside the house."""
         p = self.get_perimeter_floor("outside")
         h = self.heat_accumulator_volume / self.floor_area_inside
         th = self.wall_thickness
@@ -260,20 +565,24 @@ class Building:
     @property
     def floor_area_outside(self) -> float:
         """Calculates area floor outside the house"""
-        area = 0
-        for norm, area_f in zip(self.mesh.face_normals, self.mesh.area_faces):
-            if norm[2] == -1:
-                area += area_f
-        return area
+        return self.get_geometry("floor_area_outside", lambda: self.calc_floor_area(self.mesh))
 
     @property
     def floor_area_inside(self) -> float:
         """Calculates area floor inside the house"""
-        area = 0
-        for norm, area_f in zip(self.mesh_inside.face_normals, self.mesh_inside.area_faces):
-            if norm[2] == -1:
-                area += area_f
-        return area
+        return self.get_geometry("floor_area_inside", lambda: self.calc_floor_area(self.mesh_inside))
+
+    def calc_floor_area(self, mesh) -> float:
+        """
+        Calculates area of faces of floor of mesh.
+        Face belongs to floor if its normal is directed down
+        with deviation not more than floor_tolerance (degrees).
+
+        :param mesh: trimesh.Trimesh
+        :return: float value of area
+        """
+        mask = mesh.face_normals[:, 2] <= -math.cos(math.radians(self.floor_tolerance))
+        return float(mesh.area_faces[mask].sum())
 
     def get_perimeter_floor(self, where: str) -> float:
         """
@@ -283,10 +592,11 @@ class Building:
         :return:
             float value of perimeter
         """
-        if where == "outside":
-            return self.mesh.section(plane_origin=self.mesh.bounds[0], plane_normal=[0, 0, 1]).length
-        else:
-            return self.mesh_inside.section(plane_origin=self.mesh_inside.bounds[0], plane_normal=[0, 0, 1]).length
+        mesh = self.mesh if where == "outside" else self.mesh_inside
+        return self.get_geometry(
+            "perimeter_floor_%s" % where,
+            lambda: mesh.section(plane_origin=mesh.bounds[0], plane_normal=[0, 0, 1]).length,
+        )
 
     def get_efficient_angle(self, reflect_material: dict = None) -> float:
         """ Get angle for material. """
@@ -316,19 +626,52 @@ class Building:
         refl_power = power * kr
         return refl_power
 
-    def get_pv_power_face(self, face_tilt: float, face_azimuth: float, face_area: float) -> float:
+    def get_pv_power_faces(self, face_tilts: np.ndarray, face_azimuths: np.ndarray, face_areas: np.ndarray):
+        """
+        Get irradiation of all faces at once by batched engine.
+        Position of sun is calculated once for all faces.
+
+        :param face_tilts: array of tilts of faces
+        :param face_azimuths: array of azimuths of faces
+        :param face_areas: array of areas of faces
+        :return: np.ndarray (time x faces) with sun power of current period.
+        """
+        return calc_power_on_faces(
+            self.mc,
+            self.weather_data,
+            face_areas,
+            face_tilts,
+            face_azimuths,
+            self.efficiency,
+            "batched",
+            self.get_solar_position(),
+        )
+
+    def get_solar_position(self) -> pd.DataFrame:
         """
-        Get Irradiation from PVLIB.
+        Get position of sun for weather data from the cache shared
+        by buildings and calculations for the same site.
 
-        :param face_tilt: angle between normal of face and horizontal plane
-        :param face_azimuth: angle between normal of face and north direction
-        :param face_area: float value of area of face
-        :return: pandas DataFrame with sun power of current period.
+        :return: pd.DataFrame,
+            Column names are: ``apparent_zenith, zenith, azimuth, ...``
         """
-        self.pv.surface_tilt = face_tilt
-        self.pv.surface_azimuth = face_azimuth
-        self.mc.run_model(self.weather_data)
-        return self.mc.effective_irradiance * face_area * (self.efficiency / 100)
+        set_default_weather(self.weather_data)
+        return get_solar_position(self.location, self.weather_data, self.mc.solar_position_method, self.solar_cache)
+
+    def get_face_orientation(self, face) -> tuple:
+        """
+        Get area, tilt and azimuth of face of mesh.
+
+        :param face: indexes of vertices of face
+        :return: tuple (area, tilt, azimuth)
+        """
+        tri = [self.mesh.vertices[i].tolist() for i in face]
+        face_area = triangles.area((tri,))[0]
+        face_normal = triangles.normals((tri,))[0][0]
+        face_tilt = geometry.vector_angle((face_normal, (0, 0, 1)))[0]
+        face_normal_projection = self.projection_on_flat(face_normal)
+        face_azimuth = geometry.vector_angle((face_normal_projection, (0, 1, 0)))[0]
+        return face_area, face_tilt, face_azimuth
 
     def projection_on_flat(self, vector: tuple) -> tuple:
         """ get vector what is projection vector on the flat plane. """
@@ -341,32 +684,62 @@ class Building:
     def calc_sun_power_on_faces(self) -> None:
         """
         Calculates the power of sun on all faces of the building.
+        Engine of calculation is set by irradiance_engine:
+        "modelchain" - pvlib ModelChain runs for every face,
+        "batched" - position of sun is calculated once and irradiance is
+        projected on all faces at once.
+        If group_orientations is set then irradiance is calculated once
+        for every group of faces with the same orientation
+        (with orientation_tolerance in radians) and scaled by summed area
+        of group, power_data has only aggregate columns then and power
+        on faces is got by get_power_faces, unless power_by_faces is set.
+        If compact_power is set then power on faces is kept in
+        self.power_faces and power_data has only aggregate columns.
+        If aggregate_only is set then only aggregate columns are
+        calculated on the fly and power on faces is not kept at all.
+        If shading is set then direct irradiance is not counted on faces
+        shaded by other faces of the building (see Shading).
 
         :return: self
             changed self.power_data, self.power_data_by_days
         """
-        dict_temp_data = {}
-        face_indexes = []
-        count_faces = 0
-
-        if count_faces >= settings.COUNT_FACES_FOR_PARALLEL_CALC:
-            # TODO Start parallels calc in actors model
-            pass
+        if self.shading and self.group_orientations:
+            raise Exception("Shading can not be used with grouping of orientations of faces", "Error")
+        try:
+            self.__calc_sun_power_on_faces()
+        finally:
+            if self.__pool is not None:
+                self.__pool.shutdown()
+                self.__pool = None
+
+    def __calc_sun_power_on_faces(self) -> None:
+        """Calculates the power of sun on all faces, see calc_sun_power_on_faces."""
+        orientations = self.face_orientations
+        areas, tilts, azimuths = (orientations[name].values for name in ("area", "tilt", "azimuth"))
+
+        if self.aggregate_only:
+            self.calc_power_aggregates(areas, tilts, azimuths)
+            return
+
+        if self.compact_power:
+            self.calc_power_faces(areas, tilts, azimuths)
+            self.set_power_aggregates(
+                self.power_faces.sum(axis=1, dtype=np.float64),
+                self.power_faces.max(axis=1),
+                self.power_faces.argmax(axis=1),
+            )
+            return
+
+        if self.group_orientations and not self.power_by_faces:
+            self.calc_power_groups(areas, tilts, azimuths)
+            return
+
+        if self.group_orientations:
+            power_on_meter = self.calc_power_on_meter_groups(areas, tilts, azimuths)
+            power = power_on_meter[:, self.face_groups] * areas[None, :]
         else:
-            index = 0
-            for face in self.mesh.faces:
-                tri = [self.mesh.vertices[i].tolist() for i in face]
-                face_area = triangles.area((tri,))
-                face_normal = triangles.normals((tri,))[0][0]
-                face_tilt = geometry.vector_angle((face_normal, (0, 0, 1)))
-                face_normal_projection = self.projection_on_flat(face_normal)
-                face_azimuth = geometry.vector_angle((face_normal_projection, (0, 1, 0)))
-                sun_power_face = self.get_pv_power_face(face_tilt, face_azimuth, face_area,)
-                face_seria = pd.Series(sun_power_face, index=self.weather_data.index,)
-                dict_temp_data.update({index: face_seria})
-                face_indexes.append(index)
-                index += 1
-        self.power_data = pd.DataFrame(dict_temp_data)
+            power = self.calc_power(areas, tilts, azimuths)
+        self.power_data = pd.DataFrame(power, index=self.weather_data.index)
         fields = list(self.power_data)
         self.power_data["sum_solar_power"] = self.power_data[fields].sum(axis=1)
         self.power_data["maximum_solar_power"] = self.power_data[fields].max(axis=1)
@@ -374,6 +747,258 @@ class Building:
         self.power_data_by_days = self.power_data["sum_solar_power"].resample("1D").mean()
         return
 
+    def set_power_aggregates(self, total: np.ndarray, maximum: np.ndarray, ind_face: np.ndarray) -> None:
+        """
+        Set power_data of aggregates of power of sun on faces.
+
+        :param total: sum of power on all faces for every time
+        :param maximum: maximum of power on faces for every time
+        :param ind_face: index of face with maximum of power for every time
+        """
+        self.power_data = pd.DataFrame(index=self.weather_data.index)
+        self.power_data["sum_solar_power"] = total
+        self.power_data["maximum_solar_power"] = maximum
+        self.power_data["ind_face"] = ind_face
+        self.power_data_by_days = self.power_data["sum_solar_power"].resample("1D").mean()
+
+    def calc_power_on_meter_groups(self, areas: np.ndarray, tilts: np.ndarray, azimuths: np.ndarray) -> np.ndarray:
+        """
+        Group faces with the same orientation and calculate the power
+        of sun on one square meter of every group.
+
+        :param areas: array of areas of faces
+        :param tilts: array of tilts of faces
+        :param azimuths: array of azimuths of faces
+        :return: np.ndarray (time x groups) of power,
+            changed self.face_groups, self.power_groups
+        """
+        tilts, azimuths, self.face_groups = group_orientations(tilts, azimuths, self.orientation_tolerance)
+        power_on_meter = self.calc_power(np.ones(len(tilts)), tilts, azimuths)
+        self.power_groups = power_on_meter * np.bincount(self.face_groups, weights=areas)[None, :]
+        return power_on_meter
+
+    def calc_power_groups(self, areas: np.ndarray, tilts: np.ndarray, azimuths: np.ndarray) -> None:
+        """
+        Calculates the power of sun on groups of faces with the same
+        orientation and aggregates of power on faces from them,
+        power on every face is not calculated.
+        Face with the largest area has the maximum of power in its group.
+
+        :param areas: array of areas of faces
+        :param tilts: array of tilts of faces
+        :param azimuths: array of azimuths of faces
+        :return: changed self.power_data, self.power_data_by_days
+        """
+        power_on_meter = self.calc_power_on_meter_groups(areas, tilts, azimuths)
+        order = np.lexsort((np.arange(len(areas)), -areas, self.face_groups))
+        largest = order[np.unique(self.face_groups[order], return_index=True)[1]]
+        power = power_on_meter * areas[largest][None, :]
+        best = power.argmax(axis=1)
+        self.set_power_aggregates(
+            self.power_groups.sum(axis=1), power[np.arange(len(power)), best], largest[best],
+        )
+
+    def iter_power_chunks(self, areas: np.ndarray, tilts: np.ndarray, azimuths: np.ndarray):
+        """
+        Calculates the power of sun on faces by chunks of faces
+        of COUNT_FACES_IN_CHUNK.
+
+        :param areas: array of areas of faces
+        :param tilts: array of tilts of faces
+        :param azimuths: array of azimuths of faces
+        :return: generator of tuples (indexes of faces, np.ndarray
+            (time x faces of chunk) of power)
+        """
+        if self.group_orientations:
+            power_on_meter = self.calc_power_on_meter_groups(areas, tilts, azimuths)
+        count_chunks = max(1, len(areas) // settings.COUNT_FACES_IN_CHUNK)
+        for chunk in np.array_split(np.arange(len(areas)), count_chunks):
+            if self.group_orientations:
+                yield chunk, power_on_meter[:, self.face_groups[chunk]] * areas[chunk][None, :]
+            else:
+                yield chunk, self.calc_power(areas[chunk], tilts[chunk], azimuths[chunk], chunk)
+
+    def calc_power_faces(self, areas: np.ndarray, tilts: np.ndarray, azimuths: np.ndarray) -> np.ndarray:
+        """
+        Calculates the power of sun on faces into contiguous array
+        (time x faces) of power_dtype, it is numpy.memmap in file
+        power_path if it is set. Faces are calculated by chunks,
+        so array of float64 for all faces is not created.
+
+        :param areas: array of areas of faces
+        :param tilts: array of tilts of faces
+        :param azimuths: array of azimuths of faces
+        :return: self.power_faces
+        """
+        shape = (len(self.weather_data.index), len(areas))
+        if self.power_path:
+            self.power_faces = np.memmap(self.power_path, dtype=self.power_dtype, mode="w+", shape=shape)
+        else:
+            self.power_faces = np.empty(shape, dtype=self.power_dtype)
+        for chunk, power in self.iter_power_chunks(areas, tilts, azimuths):
+            self.power_faces[:, chunk] = power
+        return self.power_faces
+
+    def calc_power_aggregates(self, areas: np.ndarray, tilts: np.ndarray, azimuths: np.ndarray) -> None:
+        """
+        Calculates sum, maximum and index of face with maximum of power
+        of sun on faces, they are accumulated by chunks of faces,
+        so power on all faces is not kept.
+
+        :param areas: array of areas of faces
+        :param tilts: array of tilts of faces
+        :param azimuths: array of azimuths of faces
+        :return: changed self.power_data, self.power_data_by_days
+        """
+        count_times = len(self.weather_data.index)
+        total = np.zeros(count_times)
+        maximum = np.full(count_times, -np.inf)
+        ind_face = np.zeros(count_times, dtype=int)
+        for chunk, power in self.iter_power_chunks(areas, tilts, azimuths):
+            total += power.sum(axis=1)
+            chunk_ind = power.argmax(axis=1)
+            chunk_max = power[np.arange(count_times), chunk_ind]
+            better = chunk_max > maximum
+            maximum[better] = chunk_max[better]
+            ind_face[better] = chunk[chunk_ind[better]]
+        self.set_power_aggregates(total, maximum, ind_face)
+
+    def calc_power(
+        self, areas: np.ndarray, tilts: np.ndarray, azimuths: np.ndarray, faces: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Calculates the power of sun on faces in this process or
+        in pool of processes if the mesh has count_faces_for_parallel_calc
+        faces or more (faces of all chunks are counted).
+
+        :param areas: array of areas of faces
+        :param tilts: array of tilts of faces
+        :param azimuths: array of azimuths of faces
+        :param faces: indexes of faces in the mesh for shading, None - all faces
+        :return: np.ndarray (time x faces) of power (Watt)
+        """
+        solar_position = None
+        sunlit = None
+        if self.irradiance_engine == "batched":
+            solar_position = self.get_solar_position()
+        if self.shading:
+            # weather data is not changed here, ModelChain adds default weather itself
+            position = solar_position
+            if position is None:
+                position = get_solar_position(
+                    self.location, self.weather_data, self.mc.solar_position_method, self.solar_cache
+                )
+            sunlit = self.get_shading().get_sunlit(position, faces)
+        count_faces = len(areas) if faces is None else len(self.mesh.faces)
+        if self.count_faces_for_parallel_calc and count_faces >= self.count_faces_for_parallel_calc:
+            return self.calc_sun_power_parallel(areas, tilts, azimuths, solar_position, sunlit)
+        return calc_power_on_faces(
+            self.mc,
+            self.weather_data,
+            areas,
+            tilts,
+            azimuths,
+            self.efficiency,
+            self.irradiance_engine,
+            solar_position,
+            sunlit,
+        )
+
+    def get_shading(self) -> Shading:
+        """
+        Get shading of faces of the mesh. Masks of shaded faces
+        are kept in it until the mesh or size of bins are changed.
+
+        :return: Shading
+        """
+        if self.__shading is None or not self.is_actual("shading"):
+            self.__shading = Shading(self.mesh, self.shading_bin)
+            self.mark_actual("shading")
+        return self.__shading
+
+    def get_power_faces(self) -> pd.DataFrame:
+        """
+        Get power of sun on every face. Table is built on demand
+        from compact array of power on faces or from power of groups
+        of faces with the same orientation.
+
+        :return: pd.DataFrame with column of power for every face
+        """
+        if self.power_faces is not None:
+            return pd.DataFrame(self.power_faces, index=self.weather_data.index)
+        if self.face_groups is None:
+            return self.power_data[list(range(len(self.mesh.faces)))]
+        areas = self.face_areas
+        group_areas = np.bincount(self.face_groups, weights=areas)
+        power = self.power_groups[:, self.face_groups] * (areas / group_areas[self.face_groups])[None, :]
+        return pd.DataFrame(power, index=self.weather_data.index)
+
+    def calc_sun_power_parallel(
+        self,
+        areas: np.ndarray,
+        tilts: np.ndarray,
+        azimuths: np.ndarray,
+        solar_position: pd.DataFrame = None,
+        sunlit: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Calculates the power of sun on faces in pool of processes.
+        Faces are split into chunks, results of chunks are merged
+        in order of indexes of faces. Pool is created once for
+        calculation of power of sun on all faces of the building.
+
+        :param areas: array of areas of faces
+        :param tilts: array of tilts of faces
+        :param azimuths: array of azimuths of faces
+        :param solar_position: position of sun for batched engine
+        :param sunlit: part of direct irradiance which gets on faces (time x faces)
+        :return: np.ndarray (time x faces) of power (Watt)
+        """
+        set_default_weather(self.weather_data)
+        count_workers = self.count_workers or os.cpu_count()
+        chunks = np.array_split(np.arange(len(areas)), min(len(areas), count_workers * 4))
+        if self.__pool is None:
+            self.__pool = ProcessPoolExecutor(max_workers=count_workers)
+        futures = [
+            self.__pool.submit(
+                calc_power_on_faces,
+                self.mc,
+                self.weather_data,
+                areas[chunk],
+                tilts[chunk],
+                azimuths[chunk],
+                self.efficiency,
+                self.irradiance_engine,
+                solar_position,
+                sunlit[:, chunk] if sunlit is not None else None,
+            )
+            for chunk in chunks
+        ]
+        return np.hstack([future.result() for future in futures])
+
+    def get_layers(self, layers: list) -> list:
+        """
+        Get layers of thermal element with properties of their materials.
+        Layers are set from inside to outside as dicts with material,
+        thickness and optional dx, for example:
+        [{"material": "plaster", "thickness": 0.02},
+        {"material": "brick", "thickness": 0.25, "dx": 0.025},
+        {"material": "mineral_wool", "thickness": 0.1, "dx": 0.005}]
+
+        :param layers: list of layers of wall, floor or ceiling
+        :return: list of dicts of layers for ThermalElement
+        """
+        return [
+            {
+                "thickness": layer["thickness"],
+                "dx": layer.get("dx"),
+                "kappa": self.get_prop(layer["material"], "kappa"),
+                "density": self.get_prop(layer["material"], "density"),
+                "heat_capacity": self.get_prop(layer["material"], "heat_capacity"),
+            }
+            for layer in layers or []
+        ]
+
     def get_prop(self, material: str, prop: str) -> float:
         """
         Retrieve a value of property for some materials.
@@ -1,12 +1,16 @@
 import datetime
+import os
 
 import pandas as pd
 import pytz
 from pvlib.forecast import GFS
 
 from .building import Building
-from .helpers import prepare_period
+from .checkpoint import get_checkpoint_time, load_checkpoint, save_checkpoint
+from .helpers import prepare_period, split_period
+from .sweep import Sweep
 from .thermal_process import ThermalProcess
+from .weather_cache import WeatherCache
 
 
 class Calculation:
@@ -15,15 +19,19 @@ class Calculation:
     what you can take on faces of the building.
     As a result you can get html page with graphics.
     Alternatively, you can export data in file CSV or JSON.
+    Weather data can be kept in WeatherCache to not download it again
+    for the same site and period.
     """
 
-    def __init__(self, tz: str, geo: dict, building: Building):
+    def __init__(self, tz: str, geo: dict, building: Building, weather_cache: WeatherCache = None):
         """ Initialize object for calculate sun power. """
         self.progress = 0
         self.geo = geo
         self.tz = pytz.timezone(tz)
         self.pd_data_for_export = None
+        self.sweep = None
         self.building = building
+        self.weather_cache = weather_cache
 
     def compute(
         self,
@@ -32,10 +40,65 @@ class Calculation:
         year: datetime.datetime = None,
         period: tuple = None,
         with_weather: bool = True,
+        checkpoint: str = None,
+        dt: float = 3,
     ) -> None:
-        """ proxy method for prepare period and calculations. """
+        """
+        proxy method for prepare period and calculations.
+        If checkpoint is set then state of thermal model is saved in it
+        and next calculation is resumed from it.
+        """
+        start, end = prepare_period(tz=self.tz, date=date, month=month, year=year, period=period)
+        return self.start_calculation(start, end, with_weather=with_weather, checkpoint=checkpoint, dt=dt)
+
+    def compute_stream(
+        self,
+        date: datetime.datetime = None,
+        month: datetime.datetime = None,
+        year: datetime.datetime = None,
+        period: tuple = None,
+        with_weather: bool = True,
+        chunk: str = "7D",
+        dt: float = 3,
+    ):
+        """
+        Proxy method for prepare period and calculations by chunks.
+
+        :param chunk: length of chunk of period, for example: "7D"
+        :param dt: time of one step of calculation (seconds)
+        :return: generator of pd.DataFrame of results of chunks
+        """
+        start, end = prepare_period(tz=self.tz, date=date, month=month, year=year, period=period)
+        return self.iter_calculation(start, end, with_weather=with_weather, chunk=chunk, dt=dt)
+
+    def compute_sweep(
+        self,
+        grid: dict,
+        date: datetime.datetime = None,
+        month: datetime.datetime = None,
+        year: datetime.datetime = None,
+        period: tuple = None,
+        with_weather: bool = True,
+        count_workers: int = None,
+    ) -> pd.DataFrame:
+        """
+        Calculate variants of the building with parameters from grid.
+        Weather and power of sun on faces are calculated once for all variants.
+
+        :param grid: dict of name of parameter of building and list of its values
+        :param count_workers: count of processes for variants
+        :return: pd.DataFrame indexed by number of variant and time,
+            parameters of variants are in self.sweep.variants_data
+        """
         start, end = prepare_period(tz=self.tz, date=date, month=month, year=year, period=period)
-        return self.start_calculation(start, end, with_weather=with_weather)
+        get_weather = self.__get_clear_sky
+        if with_weather:
+            get_weather = self.__get_weather
+        self.building.weather_data = get_weather(start, end)
+        self.building.update_sun_power()
+        self.sweep = Sweep(self.building, grid, count_workers=count_workers)
+        self.pd_data_for_export = self.sweep.run()
+        return self.pd_data_for_export
 
     def __get_weather(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
         """
@@ -45,8 +108,24 @@ class Calculation:
         :return: pd.DataFrame,
             Column names are: ``ghi, dni, dhi``
         """
+        if self.weather_cache:
+            return self.weather_cache.get(
+                self.geo["latitude"], self.geo["longitude"], start, end, model="GFS", fetcher=self.fetch_weather
+            )
+        return self.fetch_weather(self.geo["latitude"], self.geo["longitude"], start, end)
+
+    def fetch_weather(self, latitude: float, longitude: float, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """
+        Download forecast of weather data from GFS model.
+        :param latitude: latitude of building
+        :param longitude: longitude of building
+        :param start: - pd.Timestamp, begin of period
+        :param end: - pd.Timestamp, end of period
+        :return: pd.DataFrame,
+            Column names are: ``ghi, dni, dhi``
+        """
         fx_model = GFS()
-        return fx_model.get_processed_data(self.geo["latitude"], self.geo["longitude"], start, end)
+        return fx_model.get_processed_data(latitude, longitude, start, end)
 
     def __get_clear_sky(self, start: pd.Timestamp, end: pd.Timestamp, model: str = "ineichen") -> pd.DataFrame:
         """
@@ -59,21 +138,82 @@ class Calculation:
             Column names are: ``ghi, dni, dhi``
         """
         period = pd.date_range(start=start, end=end, freq="1h", tz=self.tz)
-        return self.building.location.get_clearsky(period, model=model)
+        return self.building.solar_cache.get_clearsky(self.building.location, period, model=model)
 
-    def start_calculation(self, start: pd.Timestamp, end: pd.Timestamp, with_weather: bool = True) -> None:
-        """ Start calculations. """
+    def start_calculation(
+        self, start: pd.Timestamp, end: pd.Timestamp, with_weather: bool = True, checkpoint: str = None, dt: float = 3
+    ) -> None:
+        """
+        Start calculations.
+        If file of checkpoint exists then calculation is resumed from
+        state saved in it, only the part of period after time of the state
+        is calculated (whole period if time is not saved in it).
+        If state is saved after the end of period then nothing is
+        calculated, empty result is returned and checkpoint is kept.
+        State at the end of period is saved in checkpoint.
+        """
+        resume = checkpoint and os.path.exists(checkpoint)
+        if resume:
+            time = get_checkpoint_time(checkpoint)
+            if time is not None:
+                start = max(start, time.tz_convert(self.tz))
+            if start > end:
+                index = pd.DatetimeIndex([], tz=self.tz)
+                self.pd_data_for_export = pd.DataFrame(columns=["temp_air", "mass", "room"], index=index, dtype=float)
+                return self.pd_data_for_export
         get_weather = self.__get_clear_sky
         if with_weather:
             get_weather = self.__get_weather
         self.building.weather_data = get_weather(start, end)
-        self.building.calc_sun_power_on_faces()
+        self.building.update_sun_power()
         thermal_process = ThermalProcess(
             t_start=20, building=self.building, variant="heat_to_mass", for_plots=["mass", "room"],
         )
-        self.pd_data_for_export = thermal_process.run_process()
+        if resume:
+            thermal_process.model.check_stability(dt)
+            thermal_process.model.make_init_conditions()
+            load_checkpoint(thermal_process.model, checkpoint)
+            self.pd_data_for_export = thermal_process.run_chunk(dt)
+        else:
+            self.pd_data_for_export = thermal_process.run_process(dt)
+        if checkpoint:
+            time = self.pd_data_for_export.index[-1] + pd.Timedelta(seconds=thermal_process.seconds)
+            save_checkpoint(thermal_process.model, checkpoint, time)
         return self.pd_data_for_export
 
+    def iter_calculation(
+        self, start: pd.Timestamp, end: pd.Timestamp, with_weather: bool = True, chunk: str = "7D", dt: float = 3
+    ):
+        """
+        Start calculations by chunks of period.
+        Weather, power of sun on faces and thermal process are calculated
+        for one chunk at a time, state of thermal elements is carried
+        to the next chunk, so memory does not grow with length of period.
+
+        :param start: - pd.Timestamp, begin of period
+        :param end: - pd.Timestamp, end of period
+        :param with_weather: use forecast of weather or clear sky
+        :param chunk: length of chunk of period, for example: "7D"
+        :param dt: time of one step of calculation (seconds)
+        :return: generator of pd.DataFrame of results of chunks
+        """
+        get_weather = self.__get_clear_sky
+        if with_weather:
+            get_weather = self.__get_weather
+        thermal_process = None
+        for chunk_start, chunk_end in split_period(start, end, chunk):
+            self.building.weather_data = get_weather(chunk_start, chunk_end)
+            self.building.update_sun_power()
+            if thermal_process is None:
+                thermal_process = ThermalProcess(
+                    t_start=20, building=self.building, variant="heat_to_mass", for_plots=["mass", "room"],
+                )
+                thermal_process.model.check_stability(dt)
+                thermal_process.model.make_init_conditions()
+            else:
+                thermal_process.load_data()
+            yield thermal_process.run_chunk(dt)
+
 
 if __name__ == "__main__":
     import doctest
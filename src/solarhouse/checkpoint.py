@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from .thermal_model import ThermalModel
+
+
+def save_checkpoint(model: ThermalModel, file_path: str, time: pd.Timestamp = None) -> None:
+    """
+    Save state of thermal model (temperatures of all elements and
+    all their layers by dx) into binary file of NumPy arrays.
+
+    :param model: ThermalModel
+    :param file_path: path of file of checkpoint
+    :param time: pd.Timestamp of state, calculation can be resumed from it
+    """
+    arrays = {"time": np.array(pd.Timestamp(time).isoformat() if time is not None else "")}
+    for name, el in model.elements.items():
+        arrays["temp:%s" % name] = np.array(el.temp, dtype=float)
+        arrays["layers:%s" % name] = np.array(el.dTx_list, dtype=float)
+    with open(file_path, "wb") as file:
+        np.savez_compressed(file, **arrays)
+
+
+def load_checkpoint(model: ThermalModel, file_path: str) -> pd.Timestamp:
+    """
+    Restore state of thermal model from file of checkpoint.
+
+    :param model: ThermalModel with the same elements as saved model
+    :param file_path: path of file of checkpoint
+    :return: pd.Timestamp of state or None if it is not saved
+    """
+    with np.load(file_path) as data:
+        for name, el in model.elements.items():
+            key = "layers:%s" % name
+            if key not in data or len(data[key]) != el.count_layers:
+                raise Exception("Checkpoint does not match element %s of model" % name, "Error")
+            el.dTx_list = data[key].tolist()
+            el.temp = float(data["temp:%s" % name])
+            if el.solver:
+                el.solver.temps[:] = data[key]
+        return get_time(data)
+
+
+def get_checkpoint_time(file_path: str) -> pd.Timestamp:
+    """
+    Get time of state saved in file of checkpoint.
+
+    :param file_path: path of file of checkpoint
+    :return: pd.Timestamp of state or None if it is not saved
+    """
+    with np.load(file_path) as data:
+        return get_time(data)
+
+
+def get_time(data) -> pd.Timestamp:
+    """Get time of state from arrays of checkpoint."""
+    time = str(data["time"])
+    return pd.Timestamp(time) if time else None
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from .thermal_network import EnsembleNetwork
+from .thermal_process import ThermalProcess
+
+
+class EnsembleProcess:
+    """
+    Class implements thermal processes of many variants of a building
+    in one array. Models of all variants are compiled into networks with
+    the same topology and temperatures of nodes of all variants change
+    on every step by one batched matrix operation.
+    Variants can differ by materials, areas, efficiency, etc.
+    but must have the same count of layers of elements
+    (the same thickness of walls and floor).
+    """
+
+    def __init__(self, processes: list) -> None:
+        """
+        Initialize ensemble of processes.
+
+        :param processes: list of ThermalProcess of variants with
+            the same weather data and method of calculation
+        """
+        self.processes = processes
+        first = processes[0]
+        for process in processes[1:]:
+            if not process.sun_power_data.index.equals(first.sun_power_data.index):
+                raise Exception("Variants have different periods of calculation", "Error")
+        self.sun_power_data = np.stack([process.sun_power_data.values for process in processes])
+        self.weather_data = first.weather_data
+        self.elements_for_plots = first.elements_for_plots
+        networks = []
+        for process in processes:
+            process.model.make_init_conditions()
+            networks.append(process.model.compile())
+        self.network = EnsembleNetwork(networks)
+        self.outside_nodes = [self.network.node_index[(el.name, 0)] for el in first.model.outside_elements]
+        self.plot_nodes = [
+            self.network.node_index[(first.model.elements[name].name, 0)] for name in self.elements_for_plots
+        ]
+
+    def run_process(self, dt: float = 3) -> pd.DataFrame:
+        """
+        Start calculation of all variants.
+
+        :param dt: time of one step of calculation (seconds),
+            with implicit methods it can be up to one hour.
+        :return: pd.DataFrame of temperatures of elements
+            indexed by number of variant and time.
+        """
+        count_dt = self.processes[0].get_count_dt(dt)
+        for process in self.processes:
+            process.model.check_stability(dt)
+            process.model.make_init_conditions()
+        self.network.load_temps()
+        temps = np.empty((len(self.weather_data), len(self.processes), len(self.plot_nodes)))
+        for i, t_out in enumerate(self.weather_data.values):
+            temps[i] = np.round(self.network.temps[:, self.plot_nodes], 5)
+            self.network.temps[:, self.outside_nodes] = t_out
+            self.network.propagate(count_dt, dt, self.sun_power_data[:, i])
+        self.network.save_temps()
+        results = []
+        for v in range(len(self.processes)):
+            pd_for_plot = pd.DataFrame(self.weather_data)
+            for j, name in enumerate(self.elements_for_plots):
+                pd_for_plot.insert(j + 1, name, temps[:, v, j])
+            results.append(pd_for_plot)
+        return pd.concat(results, keys=range(len(results)), names=["variant", "time"])
+
+
+def run_ensemble(buildings: list, process_params: dict, dt: float) -> pd.DataFrame:
+    """
+    Run thermal processes of variants of building in ensembles.
+    Variants are grouped by nodes of their thermal networks and nodes
+    with fixed temperature, every group is calculated as one EnsembleProcess.
+
+    :param buildings: variants of building with power of sun on faces
+    :param process_params: parameters of ThermalProcess
+    :param dt: time of one step of calculation (seconds)
+    :return: pd.DataFrame of temperatures of elements
+        indexed by number of variant and time
+    """
+    groups = {}
+    for v, building in enumerate(buildings):
+        process = ThermalProcess(building=building, **process_params)
+        network = process.model.compile()
+        key = (tuple(network.nodes), tuple(network.capacity > 0))
+        groups.setdefault(key, []).append((v, process))
+    results = {}
+    for group in groups.values():
+        data = EnsembleProcess([process for v, process in group]).run_process(dt=dt)
+        for i, (v, process) in enumerate(group):
+            results[v] = data.loc[i]
+    return pd.concat([results[v] for v in range(len(buildings))], keys=range(len(buildings)), names=["variant", "time"])
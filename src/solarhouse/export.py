@@ -18,6 +18,23 @@ def as_file(pd_data: pd.DataFrame, type_file: str = "csv", path: str = "output")
     return file_path
 
 
+def as_file_by_chunks(chunks, type_file: str = "csv", path: str = "output") -> str:
+    """
+    Export results to file chunk by chunk as they are calculated,
+    so the whole result is never kept in memory.
+    JSON is written as lines of records.
+    """
+    file_path = os.path.join(path, "data.%s" % type_file)
+    with open(file_path, "w", newline="") as file:
+        for i, pd_data in enumerate(chunks):
+            if type_file == "csv":
+                file.write(pd_data.to_csv(header=i == 0))
+            else:
+                file.write(pd_data.reset_index().to_json(orient="records", lines=True, date_format="iso"))
+                file.write("\n")
+    return file_path
+
+
 def as_html(pd_data: pd.DataFrame, output_file_dir: str) -> None:
     """ Create HTML page with graphics. """
     fig = plt.figure()
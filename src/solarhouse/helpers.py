@@ -45,3 +45,31 @@ def prepare_period(
         start = pd.Timestamp(date, tz=tz)
         end = start + pd.Timedelta(days=1)
     return start, end
+
+
+def split_period(start: pd.Timestamp, end: pd.Timestamp, chunk: str = "7D", freq: str = "1h") -> list:
+    """
+    Split period into chunks which follow one after another without overlaps.
+    Begin and end of every chunk are included in it like in period.
+
+    >>> start = pd.Timestamp('2019-12-22')
+    >>> for period in split_period(start, start + pd.Timedelta(days=1), chunk='12h'):
+    ...     print(period[0], '-', period[1])
+    2019-12-22 00:00:00 - 2019-12-22 11:00:00
+    2019-12-22 12:00:00 - 2019-12-22 23:00:00
+    2019-12-23 00:00:00 - 2019-12-23 00:00:00
+
+    :param start: - pd.Timestamp, begin of period
+    :param end: - pd.Timestamp, end of period
+    :param chunk: length of chunk, for example: "7D", "12h"
+    :param freq: step of time of data in period
+    :return: list of tuples (start, end) of chunks
+    """
+    chunk = pd.Timedelta(chunk)
+    step = pd.Timedelta(freq)
+    periods = []
+    while start <= end:
+        chunk_end = min(start + chunk - step, end)
+        periods.append((start, chunk_end))
+        start = chunk_end + step
+    return periods
@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+from pvlib import atmosphere, irradiance
+from pvlib.location import Location
+from pvlib.modelchain import ModelChain
+
+
+def set_default_weather(weather: pd.DataFrame) -> None:
+    """
+    Add air temperature of 20 C and wind speed of 0 m/s to weather data
+    if they are not provided, the same as pvlib ModelChain does.
+
+    :param weather: pd.DataFrame with weather data
+    """
+    if weather.get("wind_speed") is None:
+        weather["wind_speed"] = 0
+    if weather.get("temp_air") is None:
+        weather["temp_air"] = 20
+
+
+def get_solar_position(
+    location: Location, weather: pd.DataFrame, method: str = "nrel_numpy", solar_cache=None
+) -> pd.DataFrame:
+    """
+    Get position of sun for every timestamp of weather data
+    the same way as pvlib ModelChain does it.
+
+    :param location: pvlib Location of building
+    :param weather: pd.DataFrame with weather data
+    :param method: method of calculation of solar position
+    :param solar_cache: SolarCache for memoization of result
+    :return: pd.DataFrame,
+        Column names are: ``apparent_zenith, zenith, azimuth, ...``
+    """
+    kwargs = {}
+    if "temp_air" in weather:
+        kwargs["temperature"] = weather["temp_air"]
+    if "pressure" in weather:
+        kwargs["pressure"] = weather["pressure"]
+    if solar_cache is not None:
+        return solar_cache.get_solarposition(location, weather.index, method=method, **kwargs)
+    return location.get_solarposition(weather.index, method=method, **kwargs)
+
+
+def get_poa_on_faces(
+    solar_position: pd.DataFrame,
+    weather: pd.DataFrame,
+    tilts: np.ndarray,
+    azimuths: np.ndarray,
+    transposition_model: str = "haydavies",
+    albedo: float = 0.25,
+    sunlit: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Calculates irradiance in plane of all faces at once.
+    Position of sun, airmass and extraterrestrial radiation are
+    calculated once for all faces, then irradiance is projected on
+    every face by broadcasting of arrays (time x faces).
+    Result is equal to effective irradiance of pvlib ModelChain
+    without losses of AOI and spectrum.
+
+    :param solar_position: pd.DataFrame of position of sun
+    :param weather: pd.DataFrame with columns ``ghi, dni, dhi``
+    :param tilts: array of tilts of faces
+    :param azimuths: array of azimuths of faces
+    :param transposition_model: model of sky diffuse irradiance
+    :param albedo: albedo of ground
+    :param sunlit: part of direct irradiance which gets on faces (time x faces),
+        None - faces are not shaded
+    :return: np.ndarray (time x faces) of irradiance (W/m2)
+    """
+    zenith = solar_position["apparent_zenith"].values[:, None]
+    azimuth = solar_position["azimuth"].values[:, None]
+    dni_extra = irradiance.get_extra_radiation(weather.index).values[:, None]
+    airmass = atmosphere.get_relative_airmass(solar_position["apparent_zenith"]).values[:, None]
+    total = irradiance.get_total_irradiance(
+        np.asarray(tilts, dtype=float)[None, :],
+        np.asarray(azimuths, dtype=float)[None, :],
+        zenith,
+        azimuth,
+        weather["dni"].values[:, None],
+        weather["ghi"].values[:, None],
+        weather["dhi"].values[:, None],
+        dni_extra=dni_extra,
+        airmass=airmass,
+        model=transposition_model,
+        albedo=albedo,
+    )
+    if sunlit is not None:
+        return total["poa_direct"] * sunlit + total["poa_diffuse"]
+    return total["poa_direct"] + total["poa_diffuse"]
+
+
+def calc_power_on_faces(
+    mc: ModelChain,
+    weather: pd.DataFrame,
+    areas: np.ndarray,
+    tilts: np.ndarray,
+    azimuths: np.ndarray,
+    efficiency: float,
+    engine: str = "modelchain",
+    solar_position: pd.DataFrame = None,
+    sunlit: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Calculates power of sun on faces.
+    With engine "modelchain" pvlib ModelChain runs for every face,
+    with engine "batched" irradiance is projected on all faces at once.
+
+    :param mc: pvlib ModelChain of building
+    :param weather: pd.DataFrame with weather data
+    :param areas: array of areas of faces
+    :param tilts: array of tilts of faces
+    :param azimuths: array of azimuths of faces
+    :param efficiency: efficiency of collectors in percents
+    :param engine: "modelchain" or "batched"
+    :param solar_position: position of sun for batched engine,
+        it is calculated if it is not set
+    :param sunlit: part of direct irradiance which gets on faces (time x faces),
+        None - faces are not shaded
+    :return: np.ndarray (time x faces) of power (Watt)
+    """
+    if engine == "batched":
+        set_default_weather(weather)
+        if solar_position is None:
+            solar_position = get_solar_position(mc.location, weather, mc.solar_position_method)
+        poa = get_poa_on_faces(
+            solar_position,
+            weather,
+            tilts,
+            azimuths,
+            transposition_model=mc.transposition_model,
+            albedo=mc.system.albedo,
+            sunlit=sunlit,
+        )
+    else:
+        poa = np.empty((len(weather.index), len(areas)))
+        for i, (tilt, azimuth) in enumerate(zip(tilts, azimuths)):
+            mc.system.surface_tilt = tilt
+            mc.system.surface_azimuth = azimuth
+            mc.run_model(weather)
+            poa[:, i] = mc.effective_irradiance
+            if sunlit is not None:
+                shaded = sunlit[:, i] < 1
+                poa[shaded, i] -= (1 - sunlit[shaded, i]) * mc.total_irrad["poa_direct"].values[shaded]
+    return poa * np.asarray(areas)[None, :] * (efficiency / 100)
+
+
+def group_orientations(tilts: np.ndarray, azimuths: np.ndarray, tolerance: float = 0.0) -> tuple:
+    """
+    Group faces with the same orientation.
+    Tilts and azimuths are in radians, they are quantized by tolerance,
+    so faces of curved surfaces with close orientations are in one group.
+    Azimuths close to 0 and to 2*pi are in one group as well.
+    Orientation of group is average of orientations of its faces.
+
+    >>> tilts, azimuths, inverse = group_orientations([1.57, 1.57, 0, 1.58], [0, 0, 0, 0])
+    >>> tilts
+    array([0.  , 1.57, 1.58])
+    >>> inverse
+    array([1, 1, 0, 2])
+    >>> tilts, azimuths, inverse = group_orientations([1.57, 1.57, 0, 1.58], [0, 0, 0, 0], tolerance=0.1)
+    >>> tilts.round(3)
+    array([0.   , 1.573])
+    >>> inverse
+    array([1, 1, 0, 1])
+    >>> tilts, azimuths, inverse = group_orientations([1.57, 1.57], [0.01, 2 * np.pi - 0.01], tolerance=0.1)
+    >>> inverse
+    array([0, 0])
+    >>> np.cos(azimuths)
+    array([1.])
+
+    :param tilts: array of tilts of faces (radians)
+    :param azimuths: array of azimuths of faces (radians)
+    :param tolerance: step of quantization of tilts and azimuths (radians),
+        0 - only faces with equal orientations are grouped
+    :return: tuple (tilts of groups, azimuths of groups, number of group of every face)
+    """
+    tilts = np.asarray(tilts, dtype=float)
+    azimuths = np.asarray(azimuths, dtype=float)
+    if not tolerance:
+        keys = np.stack([tilts, azimuths], axis=1)
+        keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        return keys[:, 0], keys[:, 1], inverse.ravel()
+    count_azimuth_bins = max(1, int(round(2 * np.pi / tolerance)))
+    keys = np.stack(
+        [np.round(tilts / tolerance), np.round(np.mod(azimuths, 2 * np.pi) / tolerance) % count_azimuth_bins], axis=1
+    )
+    keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    counts = np.bincount(inverse)
+    group_tilts = np.bincount(inverse, weights=tilts) / counts
+    # average of azimuths is taken by unit vectors, so it is correct near 0 and 2*pi
+    group_azimuths = np.arctan2(
+        np.bincount(inverse, weights=np.sin(azimuths)), np.bincount(inverse, weights=np.cos(azimuths))
+    )
+    return group_tilts, np.mod(group_azimuths, 2 * np.pi), inverse
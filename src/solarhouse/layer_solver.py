@@ -0,0 +1,175 @@
+import math
+
+import numpy as np
+
+
+class LayerSolver:
+    """
+    Array-backed solver of heat conduction through layers of a wall.
+    Keeps temperatures, heat capacities of layers and areas and thermal
+    resistances of faces between neighbouring layers in NumPy arrays
+    and updates all layers of the wall in one vectorized step.
+    It uses the same explicit scheme as ThermalElement.compute:
+    Tdx = Tdx0 + dt * (q_enter - q_loss) / cmdx
+    Example: wall of birch with dx = 0.01 m and 1 kW of power applied.
+
+    >>> s = LayerSolver(\
+        temps=[20.0] * 20,\
+        capacity=[700.0 * 1250.0 * 0.01 * 1.05] * 20,\
+        area=[1.05] * 19,\
+        resistance=[0.01 / 0.15] * 19,\
+    )
+    >>> s.count_layers
+    20
+    >>> s.step(q_enter=1000, q_out=0.0, dt=1)
+    >>> round(s.temps[0], 3)
+    20.109
+    >>> round(s.get_losses()[0], 3)
+    1.714
+    """
+
+    def __init__(self, temps, capacity, area, resistance):
+        """
+        Initialize solver by arrays of layers.
+
+        :param temps: temperatures of layers
+        :param capacity: heat capacity of each layer (J/K)
+        :param area: area of face between layer i and layer i + 1
+        :param resistance: dx / kappa between layer i and layer i + 1
+        """
+        self.temps = np.array(temps, dtype=float)
+        self.capacity = np.asarray(capacity, dtype=float)
+        self.area = np.asarray(area, dtype=float)
+        self.resistance = np.asarray(resistance, dtype=float)
+        self.count_layers = len(self.temps)
+        self.__q_in = np.empty(self.count_layers)
+        self.__q_loss = np.empty(self.count_layers)
+
+    @classmethod
+    def from_element(cls, element):
+        """
+        Create solver with constants of layers of the ThermalElement.
+
+        :param element: ThermalElement represented as a wall
+        :return: LayerSolver
+        """
+        if element.layers:
+            return cls.from_layers(element)
+        count = element.count_layers
+        a = element.density * element.heat_capacity
+        if element.by_avegare:
+            areas = np.full(count + 1, element.area_average)
+        else:
+            d_linear = math.sqrt(element.area_inside) + np.arange(count + 1) * element.dx * element.k_area
+            areas = d_linear * d_linear
+        capacity = element.dx * areas[:count] * a
+        area = np.minimum(areas[1:count], element.area_outside)
+        resistance = np.full(count - 1, element.dx / element.kappa)
+        return cls(element.dTx_list, capacity, area, resistance)
+
+    @classmethod
+    def from_layers(cls, element):
+        """
+        Create solver for the ThermalElement with layers of different
+        materials. Every cell by dx has its own thickness, kappa and
+        heat capacity, thermal resistance between neighbouring cells is
+        dx_i / (2 * kappa_i) + dx_i+1 / (2 * kappa_i+1).
+
+        :param element: ThermalElement with list of layers
+        :return: LayerSolver
+        """
+        dx, kappa, cm = make_layers(element.layers, element.dx)
+        count = len(dx)
+        bounds = np.concatenate([[0.0], np.cumsum(dx)])
+        if element.by_avegare:
+            areas = np.full(count + 1, element.area_average)
+        else:
+            d_linear = math.sqrt(element.area_inside) + bounds * element.k_area
+            areas = d_linear * d_linear
+        capacity = dx * areas[:count] * cm
+        area = np.minimum(areas[1:count], element.area_outside)
+        half = dx / (2 * kappa)
+        resistance = half[:-1] + half[1:]
+        return cls(element.dTx_list, capacity, area, resistance)
+
+    @property
+    def max_stable_dt(self) -> float:
+        """
+        Maximum dt (seconds) when explicit calculation of layers is stable:
+        dt <= capacity_i / (sum of conductances of faces of layer i)
+
+        :return: float value of dt
+        """
+        conductance = self.area / self.resistance
+        total = np.concatenate([conductance, [0.0]]) + np.concatenate([[0.0], conductance])
+        if not total.any():
+            return None
+        return float(np.min(self.capacity[total > 0] / total[total > 0]))
+
+    def init_conditions(self, val: float) -> None:
+        """Reduction of all layers to initial temperature."""
+        self.temps[:] = val
+
+    def get_losses(self) -> np.ndarray:
+        """
+        Calculates power which goes through faces between layers.
+        q_loss = area * (T_i - T_i+1) / (dx / kappa)
+
+        :return: array of power for each face between layers
+        """
+        return self.area * (self.temps[:-1] - self.temps[1:]) / self.resistance
+
+    def step(self, q_enter: float, q_out: float, dt: float) -> None:
+        """
+        Calculates temperatures of all layers on dt.
+
+        :param q_enter: power enters into the first layer
+        :param q_out: power goes out from the last layer
+        :param dt: range of time for calculate
+        :return: change self.temps
+        """
+        losses = self.get_losses()
+        self.__q_in[0] = q_enter
+        self.__q_in[1:] = losses
+        self.__q_loss[:-1] = losses
+        self.__q_loss[-1] = q_out
+        self.temps += dt * (self.__q_in - self.__q_loss) / self.capacity
+
+
+def make_layers(layers: list, dx: float = None) -> tuple:
+    """
+    Make arrays of cells by dx of wall from list of layers of materials
+    (from inside to outside). Every layer is split into equal cells
+    by its own dx, so thin layers of insulation have small cells
+    and thick layers of massive materials have big ones.
+
+    >>> dx, kappa, cm = make_layers([\
+        {'thickness': 0.02, 'kappa': 0.04, 'density': 50, 'heat_capacity': 840, 'dx': 0.005},\
+        {'thickness': 0.2, 'kappa': 0.7, 'density': 1800, 'heat_capacity': 880, 'dx': 0.05}])
+    >>> dx.round(3)
+    array([0.005, 0.005, 0.005, 0.005, 0.05 , 0.05 , 0.05 , 0.05 ])
+    >>> kappa
+    array([0.04, 0.04, 0.04, 0.04, 0.7 , 0.7 , 0.7 , 0.7 ])
+
+    :param layers: list of dicts with thickness, kappa, density,
+        heat_capacity and optional dx of layer (meters)
+    :param dx: dx for layers without their own dx, if it is not set
+        layer is one cell
+    :return: tuple of arrays (dx, kappa, density * heat_capacity) of cells
+    """
+    dx_list = []
+    kappa_list = []
+    cm_list = []
+    for layer in layers:
+        thickness = layer["thickness"]
+        count = max(1, int(round(thickness / (layer.get("dx") or dx or thickness))))
+        dx_list.extend([thickness / count] * count)
+        kappa_list.extend([layer["kappa"]] * count)
+        cm_list.extend([layer["density"] * layer["heat_capacity"]] * count)
+    return np.array(dx_list), np.array(kappa_list), np.array(cm_list)
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
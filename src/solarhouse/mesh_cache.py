@@ -0,0 +1,166 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+from trimesh import Trimesh
+
+from . import settings
+
+
+class MeshCache:
+    """
+    Class implements cache of preprocessed meshes of buildings.
+    Centred vertices, faces, normals and areas of faces of the mesh and
+    vertices of the inside mesh are kept as arrays keyed by hash of
+    content of file of the mesh, so parsing, validation and centring
+    of the mesh are done once for the same file.
+    The least recently used arrays are removed from memory
+    when there are more than max_entries of them.
+    If path is set arrays are kept on disk in .npz files as well
+    and can be used by other runs.
+    Every call returns new meshes, so callers can change them.
+    Example: the mesh is parsed once for the same file.
+
+    >>> cache = MeshCache(max_entries=2)
+    >>> file_path = 'test_cache.obj'
+    >>> with open(file_path, 'w') as file:\
+        file.write('v 0 0 0\\nv 1 0 0\\nv 0 1 0\\nv 0 0 1\\nf 1 3 2\\nf 1 2 4\\nf 1 4 3\\nf 2 3 4\\n')
+    64
+    >>> key = cache.get_key(file_path)
+    >>> from trimesh import load
+    >>> mesh = cache.get_mesh(key, lambda: load(file_path))
+    >>> os.remove(file_path)
+    >>> len(cache)
+    1
+    >>> cache.get_mesh(key, None).area == mesh.area
+    True
+    >>> inside = cache.get_inside(key, 0.1, lambda: mesh.copy().apply_scale(0.5))
+    >>> len(cache)
+    2
+    >>> round(cache.get_inside(key, 0.1, None).volume / mesh.volume, 3)
+    0.125
+    """
+
+    def __init__(self, max_entries: int = 16, path: str = None) -> None:
+        """
+        Initialize cache.
+
+        :param max_entries: maximum count of meshes in memory
+        :param path: directory for files of meshes, None - only in memory
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getstate__(self) -> dict:
+        """Meshes in memory are not copied to other processes."""
+        state = self.__dict__.copy()
+        state["entries"] = OrderedDict()
+        return state
+
+    def get_key(self, file_path: str) -> str:
+        """
+        Get key of mesh by hash of content of its file.
+
+        :param file_path: path of file of the mesh
+        :return: string of key
+        """
+        sha = hashlib.sha1()
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def get(self, key: str, calc) -> dict:
+        """
+        Get arrays by key from memory, from disk or calculate them.
+
+        :param key: key of arrays
+        :param calc: function which calculates dict of arrays
+        :return: dict of np.ndarray
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        file_path = os.path.join(self.path, "%s.npz" % key) if self.path else None
+        if file_path and os.path.exists(file_path):
+            with np.load(file_path) as data:
+                arrays = {name: data[name] for name in data.files}
+        else:
+            arrays = calc()
+            if file_path:
+                with open(file_path, "wb") as file:
+                    np.savez_compressed(file, **arrays)
+        self.entries[key] = arrays
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return arrays
+
+    def get_mesh(self, key: str, calc) -> Trimesh:
+        """
+        Get preprocessed mesh.
+
+        :param key: key of file of the mesh
+        :param calc: function which loads, checks and centres the mesh
+        :return: trimesh.Trimesh
+        """
+
+        def get_arrays():
+            mesh = calc()
+            return {
+                "vertices": mesh.vertices,
+                "faces": mesh.faces,
+                "face_normals": mesh.face_normals,
+                "area_faces": mesh.area_faces,
+            }
+
+        arrays = self.get(key, get_arrays)
+        return Trimesh(
+            vertices=arrays["vertices"].copy(),
+            faces=arrays["faces"].copy(),
+            face_normals=arrays["face_normals"].copy(),
+            process=False,
+            initial_cache={"area_faces": arrays["area_faces"].copy()},
+        )
+
+    def get_inside(
+        self, key: str, wall_thickness: float, calc, method: str = "scale", resolution: float = None
+    ) -> Trimesh:
+        """
+        Get inside mesh of walls of thickness.
+
+        :param key: key of file of the mesh
+        :param wall_thickness: thickness of walls
+        :param calc: function which calculates the inside mesh
+        :param method: method of calculation of the inside mesh
+        :param resolution: resolution of calculation of the inside mesh
+        :return: trimesh.Trimesh
+        """
+
+        def get_arrays():
+            mesh = calc()
+            return {"vertices": mesh.vertices, "faces": mesh.faces}
+
+        params = (float(wall_thickness), method, resolution)
+
+        arrays = self.get("%s-inside-%s" % (key, hashlib.sha1(repr(params).encode()).hexdigest()), get_arrays)
+        return Trimesh(vertices=arrays["vertices"].copy(), faces=arrays["faces"].copy(), process=False)
+
+    def clear(self) -> None:
+        """Remove all meshes from memory."""
+        self.entries.clear()
+
+
+default_mesh_cache = MeshCache(max_entries=settings.MESH_CACHE_SIZE, path=settings.MESH_CACHE_PATH)
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+
+class Recorder:
+    """
+    Class implements recording of temperatures of thermal elements
+    at fixed interval of time during calculation.
+    Temperatures are written into arrays allocated for the whole
+    duration of calculation. For elements from profiles temperatures
+    of all layers by dx (dTx_list) are recorded.
+    Example: record temperature of air and profile of wall every 10 minutes.
+
+    >>> from solarhouse.thermal_element import ThermalElement
+    >>> room = ThermalElement(name='room', temp0=20.0, density=1.27, heat_capacity=1007, volume=1)
+    >>> wall = ThermalElement(name='wall', temp0=20.0, dx=0.1, thickness=0.4, kappa=0.15,\
+        density=700.0, heat_capacity=1250.0, area_inside=1, area_outside=1)
+    >>> recorder = Recorder({'room': room, 'wall': wall}, interval=600, duration=3600,\
+        elements=['room'], profiles=['wall'])
+    >>> recorder.steps_to_record(dt=60)
+    0
+    >>> recorder.record()
+    >>> recorder.steps_to_record(dt=60)
+    10
+    >>> recorder.advance(600)
+    >>> recorder.get_data()
+           room
+    0.0    20.0
+    600.0  20.0
+    >>> recorder.get_profile('wall').shape
+    (2, 4)
+    """
+
+    def __init__(
+        self,
+        model_elements: dict,
+        interval: float,
+        duration: float,
+        elements: list = None,
+        profiles: list = None,
+        start: pd.Timestamp = None,
+    ) -> None:
+        """
+        Initialize recorder.
+
+        :param model_elements: dict of thermal elements of model by names
+        :param interval: interval of time between records (seconds)
+        :param duration: duration of calculation (seconds)
+        :param elements: names of elements for recording of temperature
+        :param profiles: names of elements for recording of temperatures
+            of all layers
+        :param start: pd.Timestamp of begin of calculation, if it is set
+            records are indexed by time, else by seconds
+        """
+        self.model_elements = model_elements
+        self.interval = interval
+        self.elements = elements or []
+        self.profiles = profiles or []
+        self.start = start
+        count = int(duration // interval) + 1
+        self.times = np.empty(count)
+        self.temps = np.empty((count, len(self.elements)))
+        self.profile_temps = {name: np.empty((count, model_elements[name].count_layers)) for name in self.profiles}
+        self.count = 0
+        self.time = 0.0
+        self.next_time = 0.0
+
+    def steps_to_record(self, dt: float) -> int:
+        """
+        Get count of steps of dt before next record.
+
+        :param dt: time of one step (seconds)
+        :return: count of steps
+        """
+        return max(0, int(np.ceil((self.next_time - self.time) / dt - 1e-9)))
+
+    def advance(self, seconds: float) -> None:
+        """
+        Move time of recorder and record temperatures if it is time for it.
+
+        :param seconds: time of calculation since last call (seconds)
+        """
+        self.time += seconds
+        if self.time >= self.next_time - 1e-9:
+            self.record()
+
+    def record(self) -> None:
+        """Record temperatures of elements at current time."""
+        if self.count == len(self.times):
+            raise Exception("Buffers of recorder are full", "Error")
+        self.times[self.count] = self.time
+        for i, name in enumerate(self.elements):
+            self.temps[self.count, i] = self.model_elements[name].temp
+        for name, temps in self.profile_temps.items():
+            element = self.model_elements[name]
+            temps[self.count] = element.dTx_list if element.count_layers > 1 else element.temp
+        self.count += 1
+        self.next_time = self.time + self.interval
+
+    def get_index(self) -> pd.Index:
+        """Get index of records by seconds or by time."""
+        seconds = self.times[: self.count]
+        if self.start is None:
+            return pd.Index(seconds)
+        return self.start + pd.to_timedelta(seconds, unit="s")
+
+    def get_data(self) -> pd.DataFrame:
+        """
+        Get recorded temperatures of elements.
+
+        :return: pd.DataFrame with column for every element
+        """
+        return pd.DataFrame(self.temps[: self.count], index=self.get_index(), columns=self.elements)
+
+    def get_profile(self, name: str) -> pd.DataFrame:
+        """
+        Get recorded temperatures of layers of element.
+
+        :param name: name of element
+        :return: pd.DataFrame with column for every layer,
+            name of column is distance from inside surface (meters)
+        """
+        temps = self.profile_temps[name][: self.count]
+        columns = self.model_elements[name].get_positions()
+        return pd.DataFrame(temps, index=self.get_index(), columns=columns)
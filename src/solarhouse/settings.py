@@ -1 +1,11 @@
-COUNT_FACES_FOR_PARALLEL_CALC = 100
+COUNT_FACES_FOR_PARALLEL_CALC = 1000
+COUNT_WORKERS_FOR_PARALLEL_CALC = None
+SOLAR_CACHE_SIZE = 64
+SOLAR_CACHE_PATH = None
+COUNT_FACES_IN_CHUNK = 1000
+ADAPTIVE_POWER_CHANGE = 0.1
+FLOOR_TILT_TOLERANCE = 1.0
+MESH_CACHE_SIZE = 16
+MESH_CACHE_PATH = None
+SHADING_BIN_SIZE = 2.0
+COUNT_RAY_TESTS_IN_CHUNK = 1000000
@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+from trimesh import Trimesh
+
+from . import settings
+
+
+class Shading:
+    """
+    Class implements self-shading of faces of the building.
+    Ray from centroid of every face to the sun is cast against triangles
+    of the mesh, the face is shaded if the ray hits any of them.
+    Only triangles whose projections on the plane perpendicular to the sun
+    cover the centroid are tested, so cost does not grow as square
+    of count of faces.
+    Positions of sun are rounded to bins of bin_size degrees of zenith
+    and azimuth, rays are cast once for every bin and masks of faces
+    are kept, so positions of sun of a year need a few hundred casts.
+    Only direct irradiance is removed from shaded faces.
+    Example: faces of the box do not shade each other.
+
+    >>> from trimesh.creation import box
+    >>> shading = Shading(box(extents=(1, 1, 1)), bin_size=5)
+    >>> bool(shading.calc_sunlit(shading.get_direction(60, 45)).all())
+    True
+    >>> position = pd.DataFrame({'apparent_zenith': [30, 31, 95], 'azimuth': [180, 181, 0]})
+    >>> shading.get_sunlit(position).shape
+    (3, 12)
+    >>> len(shading)
+    1
+    """
+
+    def __init__(self, mesh: Trimesh, bin_size: float = settings.SHADING_BIN_SIZE) -> None:
+        """
+        Initialize shading of the mesh.
+
+        :param mesh: trimesh.Trimesh of the building
+        :param bin_size: size of bins of zenith and azimuth of sun (degrees)
+        """
+        self.bin_size = bin_size
+        self.normals = np.array(mesh.face_normals)
+        self.eps = 1e-6 * mesh.scale
+        self.origins = mesh.triangles_center + self.normals * self.eps
+        triangles = mesh.triangles
+        self.vertices = triangles[:, 0]
+        self.edges_1 = triangles[:, 1] - self.vertices
+        self.edges_2 = triangles[:, 2] - self.vertices
+        self.masks = {}
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    @staticmethod
+    def get_direction(zenith: float, azimuth: float) -> np.ndarray:
+        """
+        Get unit vector directed to the sun, axis y is directed to the north,
+        axis x to the east and axis z up.
+
+        :param zenith: zenith of sun (degrees)
+        :param azimuth: azimuth of sun clockwise from the north (degrees)
+        :return: np.ndarray of vector
+        """
+        zenith, azimuth = np.radians(zenith), np.radians(azimuth)
+        return np.array([np.sin(zenith) * np.sin(azimuth), np.sin(zenith) * np.cos(azimuth), np.cos(zenith)])
+
+    def calc_sunlit(self, direction: np.ndarray) -> np.ndarray:
+        """
+        Calculates which faces are not shaded by other faces for direction of sun.
+        Rays from faces turned to the sun are intersected (Moller-Trumbore)
+        only with triangles found by get_candidates, by chunks of pairs.
+        Faces turned away from the sun are not shaded, they do not get
+        direct irradiance anyway.
+
+        :param direction: unit vector directed to the sun
+        :return: np.ndarray of bool for every face, False - face is shaded
+        """
+        sunlit = np.ones(len(self.normals), dtype=bool)
+        rays = np.flatnonzero(self.normals @ direction > 0)
+        p = np.cross(direction, self.edges_2)
+        det = np.einsum("ij,ij->i", self.edges_1, p)
+        triangles = np.flatnonzero(np.abs(det) > 1e-12)
+        if not len(rays) or not len(triangles):
+            return sunlit
+        inv_det = np.zeros(len(det))
+        inv_det[triangles] = 1.0 / det[triangles]
+        pair_rays, pair_triangles = self.get_candidates(direction, rays, triangles)
+        count_chunks = max(1, len(pair_rays) // settings.COUNT_RAY_TESTS_IN_CHUNK)
+        for chunk in np.array_split(np.arange(len(pair_rays)), count_chunks):
+            ray, triangle = pair_rays[chunk], pair_triangles[chunk]
+            s = self.origins[ray] - self.vertices[triangle]
+            u = np.einsum("ij,ij->i", s, p[triangle]) * inv_det[triangle]
+            q = np.cross(s, self.edges_1[triangle])
+            v = (q @ direction) * inv_det[triangle]
+            t = np.einsum("ij,ij->i", q, self.edges_2[triangle]) * inv_det[triangle]
+            hits = (u >= 0) & (v >= 0) & (u + v <= 1) & (t > self.eps)
+            sunlit[ray[hits]] = False
+        return sunlit
+
+    def get_candidates(self, direction: np.ndarray, rays: np.ndarray, triangles: np.ndarray) -> tuple:
+        """
+        Get pairs of rays and triangles which can intersect.
+        Origins of rays and triangles are projected on the plane
+        perpendicular to direction of sun. Ray can hit only triangle
+        whose bounding box on the plane contains origin of the ray and
+        which is farther along the direction than the origin.
+        Bounding boxes are put into uniform grid of cells on the plane,
+        so rays are compared only with triangles of their cells.
+
+        :param direction: unit vector directed to the sun
+        :param rays: indexes of faces which rays are cast from
+        :param triangles: indexes of triangles which rays can hit
+        :return: tuple of arrays (indexes of faces of rays, indexes of triangles)
+        """
+        axis = np.array([1.0, 0.0, 0.0]) if abs(direction[2]) > 0.9 else np.array([0.0, 0.0, 1.0])
+        axis_1 = np.cross(direction, axis)
+        axis_1 /= np.linalg.norm(axis_1)
+        basis = np.stack([axis_1, np.cross(direction, axis_1), direction], axis=1)
+        origins = self.origins[rays] @ basis
+        vertices = self.vertices[triangles]
+        corners = (
+            np.stack([vertices, vertices + self.edges_1[triangles], vertices + self.edges_2[triangles]], axis=1) @ basis
+        )
+        low = corners[:, :, :2].min(axis=1) - self.eps
+        high = corners[:, :, :2].max(axis=1) + self.eps
+        far = corners[:, :, 2].max(axis=1)
+
+        start = origins[:, :2].min(axis=0)
+        size = origins[:, :2].max(axis=0) - start
+        cell = max(
+            np.sqrt(np.prod(np.maximum(size, self.eps)) / len(rays)), np.median((high - low).max(axis=1)), self.eps
+        )
+        shape = (size // cell).astype(int) + 1
+        low_cells = np.floor((low - start) / cell).astype(int)
+        high_cells = np.floor((high - start) / cell).astype(int)
+        inside = ((high_cells >= 0) & (low_cells < shape)).all(axis=1)
+        low_cells = np.clip(low_cells[inside], 0, shape - 1)
+        high_cells = np.clip(high_cells[inside], 0, shape - 1)
+        counts = high_cells - low_cells + 1
+        grid_triangles, offsets = expand(np.flatnonzero(inside), counts.prod(axis=1))
+        count_y = counts[:, 1].repeat(counts.prod(axis=1))
+        cell_x = low_cells[:, 0].repeat(counts.prod(axis=1)) + offsets // count_y
+        cell_y = low_cells[:, 1].repeat(counts.prod(axis=1)) + offsets % count_y
+        grid_cells = cell_x * shape[1] + cell_y
+        order = np.argsort(grid_cells, kind="stable")
+        grid_cells, grid_triangles = grid_cells[order], grid_triangles[order]
+
+        ray_cells = np.floor((origins[:, :2] - start) / cell).astype(int)
+        ray_cells = np.clip(ray_cells, 0, shape - 1)
+        ray_cells = ray_cells[:, 0] * shape[1] + ray_cells[:, 1]
+        begins = np.searchsorted(grid_cells, ray_cells, side="left")
+        ends = np.searchsorted(grid_cells, ray_cells, side="right")
+        pair_rays, offsets = expand(np.arange(len(rays)), ends - begins)
+        pair_triangles = grid_triangles[begins.repeat(ends - begins) + offsets]
+
+        point = origins[pair_rays]
+        near = (
+            (low[pair_triangles] <= point[:, :2]).all(axis=1)
+            & (point[:, :2] <= high[pair_triangles]).all(axis=1)
+            & (far[pair_triangles] > point[:, 2])
+        )
+        return rays[pair_rays[near]], triangles[pair_triangles[near]]
+
+    def get_mask(self, key: tuple) -> np.ndarray:
+        """
+        Get mask of faces not shaded for bin of position of sun.
+
+        :param key: tuple of indexes of bins of zenith and azimuth
+        :return: np.ndarray of bool for every face
+        """
+        if key not in self.masks:
+            zenith, azimuth = ((index + 0.5) * self.bin_size for index in key)
+            self.masks[key] = self.calc_sunlit(self.get_direction(zenith, azimuth))
+        return self.masks[key]
+
+    def get_sunlit(self, solar_position: pd.DataFrame, faces: np.ndarray = None) -> np.ndarray:
+        """
+        Get part of direct irradiance which gets on faces for every position of sun.
+
+        :param solar_position: pd.DataFrame of position of sun,
+            Column names are: ``apparent_zenith, azimuth, ...``
+        :param faces: indexes of faces, None - all faces
+        :return: np.ndarray (time x faces) of 1.0 for sunlit and 0.0 for shaded faces
+        """
+        faces = np.arange(len(self.normals)) if faces is None else np.asarray(faces)
+        zenith = solar_position["apparent_zenith"].values
+        azimuth = solar_position["azimuth"].values % 360
+        sunlit = np.ones((len(zenith), len(faces)))
+        up = np.flatnonzero(zenith < 90)
+        if not len(up):
+            return sunlit
+        keys = np.stack([zenith[up] // self.bin_size, azimuth[up] // self.bin_size], axis=1).astype(int)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        masks = np.stack([self.get_mask(tuple(int(index) for index in key)) for key in unique_keys])[:, faces]
+        sunlit[up] = masks[inverse.reshape(-1)]
+        return sunlit
+
+
+def expand(items: np.ndarray, counts: np.ndarray) -> tuple:
+    """
+    Repeat every item by its count and number the copies of every item.
+
+    >>> expand(np.array([5, 7]), np.array([2, 3]))
+    (array([5, 5, 7, 7, 7]), array([0, 1, 0, 1, 2]))
+
+    :param items: array of items
+    :param counts: count of copies of every item
+    :return: tuple of arrays (repeated items, numbers of copies)
+    """
+    firsts = np.cumsum(counts) - counts
+    return items.repeat(counts), np.arange(counts.sum()) - firsts.repeat(counts)
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,153 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pvlib.location import Location
+
+from . import settings
+
+
+class SolarCache:
+    """
+    Class implements memoization of clear sky irradiance and position of sun.
+    Results are keyed by location, index of time and model.
+    The least recently used results are removed from memory
+    when there are more than max_entries of them.
+    If path is set results are kept on disk as well and can be used
+    by other runs.
+    Copies of results are returned, so callers can change them.
+    Example: position of sun is calculated once for the same location and time.
+
+    >>> cache = SolarCache(max_entries=2)
+    >>> location = Location(latitude=54.84, longitude=83.26)
+    >>> index = pd.date_range(start='2019-06-22', periods=24, freq='1h', tz='Asia/Novosibirsk')
+    >>> position = cache.get_solarposition(location, index)
+    >>> len(cache)
+    1
+    >>> cache.get_solarposition(location, index).equals(position)
+    True
+    >>> len(cache)
+    1
+    >>> clear_sky = cache.get_clearsky(location, index)
+    >>> list(clear_sky.columns)
+    ['ghi', 'dni', 'dhi']
+    >>> len(cache)
+    2
+    """
+
+    def __init__(self, max_entries: int = 64, path: str = None) -> None:
+        """
+        Initialize cache.
+
+        :param max_entries: maximum count of results in memory
+        :param path: directory for files of results, None - only in memory
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getstate__(self) -> dict:
+        """Results in memory are not copied to other processes."""
+        state = self.__dict__.copy()
+        state["entries"] = OrderedDict()
+        return state
+
+    def get_key(self, kind: str, location: Location, index: pd.DatetimeIndex, model: str, *data) -> str:
+        """
+        Get key of result.
+
+        :param kind: kind of result
+        :param location: pvlib Location
+        :param index: index of time
+        :param model: name of model or method of calculation
+        :param data: other series which result depends on
+        :return: string of key
+        """
+        sha = hashlib.sha1()
+        params = (
+            kind,
+            location.latitude,
+            location.longitude,
+            location.altitude,
+            str(location.tz),
+            str(index.tz),
+            model,
+        )
+        sha.update(repr(params).encode())
+        sha.update(index.asi8.tobytes())
+        for series in data:
+            sha.update(np.asarray(series, dtype=float).tobytes())
+        return sha.hexdigest()
+
+    def get(self, key: str, calc) -> pd.DataFrame:
+        """
+        Get result by key from memory, from disk or calculate it.
+
+        :param key: key of result
+        :param calc: function which calculates result
+        :return: pd.DataFrame of result
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key].copy()
+        file_path = os.path.join(self.path, "%s.h5" % key) if self.path else None
+        if file_path and os.path.exists(file_path):
+            result = pd.read_hdf(file_path, "result")
+        else:
+            result = calc()
+            if file_path:
+                result.to_hdf(file_path, "result", mode="w")
+        self.entries[key] = result
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return result.copy()
+
+    def get_clearsky(self, location: Location, index: pd.DatetimeIndex, model: str = "ineichen") -> pd.DataFrame:
+        """
+        Get clear sky irradiance for location.
+
+        :param location: pvlib Location
+        :param index: index of time
+        :param model: the clear sky model to use
+        :return: pd.DataFrame,
+            Column names are: ``ghi, dni, dhi``
+        """
+        key = self.get_key("clearsky", location, index, model)
+        return self.get(key, lambda: location.get_clearsky(index, model=model))
+
+    def get_solarposition(
+        self, location: Location, index: pd.DatetimeIndex, method: str = "nrel_numpy", **kwargs
+    ) -> pd.DataFrame:
+        """
+        Get position of sun for location.
+
+        :param location: pvlib Location
+        :param index: index of time
+        :param method: method of calculation of solar position
+        :param kwargs: temperature and pressure series of weather
+        :return: pd.DataFrame,
+            Column names are: ``apparent_zenith, zenith, azimuth, ...``
+        """
+        names = sorted(kwargs)
+        key = self.get_key("solarposition", location, index, method + repr(names), *[kwargs[n] for n in names])
+        return self.get(key, lambda: location.get_solarposition(index, method=method, **kwargs))
+
+    def clear(self) -> None:
+        """Remove all results from memory."""
+        self.entries.clear()
+
+
+default_cache = SolarCache(max_entries=settings.SOLAR_CACHE_SIZE, path=settings.SOLAR_CACHE_PATH)
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -0,0 +1,124 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from . import settings
+from .building import Building
+from .ensemble import run_ensemble
+from .thermal_process import ThermalProcess
+
+
+def make_variants(grid: dict) -> list:
+    """
+    Make all combinations of parameters of grid.
+    Name of parameter with dot sets item of dict parameter of building.
+
+    >>> make_variants({'wall_thickness': [0.2, 0.3], 'windows.area': [0.5]})
+    [{'wall_thickness': 0.2, 'windows': {'area': 0.5}}, {'wall_thickness': 0.3, 'windows': {'area': 0.5}}]
+
+    :param grid: dict of name of parameter and list of its values
+    :return: list of dicts of parameters
+    """
+    names = list(grid)
+    variants = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = {}
+        for name, value in zip(names, values):
+            if "." in name:
+                name, key = name.split(".", 1)
+                params.setdefault(name, {})[key] = value
+            else:
+                params[name] = value
+        variants.append(params)
+    return variants
+
+
+def run_variant(building: Building, process_params: dict, dt: float) -> pd.DataFrame:
+    """
+    Run thermal process of one variant of building.
+
+    :param building: variant of building with power of sun on faces
+    :param process_params: parameters of ThermalProcess
+    :param dt: time of one step of calculation (seconds)
+    :return: pd.DataFrame of temperatures of elements
+    """
+    return ThermalProcess(building=building, **process_params).run_process(dt=dt)
+
+
+class Sweep:
+    """
+    Class implements calculation of many variants of one building.
+    All variants share mesh, weather data and power of sun on faces,
+    only thermal processes are calculated for every variant
+    in pool of processes or, with engine "ensemble", variants with
+    the same topology are calculated together in one array.
+    """
+
+    def __init__(
+        self,
+        building: Building,
+        grid: dict,
+        count_workers: int = None,
+        dt: float = 3,
+        engine: str = "process",
+        **process_params
+    ):
+        """
+        Initialize sweep of parameters.
+
+        :param building: building with weather data
+        :param grid: dict of name of parameter of building and list
+            of its values, for example: {'wall_thickness': [0.2, 0.3],
+            'windows.area': [0.3, 0.5], 'efficiency': [60, 75]}
+        :param count_workers: count of processes, None - all cores,
+            1 - variants are calculated in this process
+        :param dt: time of one step of calculation (seconds)
+        :param engine: "process" - every variant is calculated by
+            its own ThermalProcess, "ensemble" - variants are calculated
+            together by EnsembleProcess
+        :param process_params: parameters of ThermalProcess
+        """
+        self.building = building
+        self.grid = grid
+        self.count_workers = count_workers or settings.COUNT_WORKERS_FOR_PARALLEL_CALC or os.cpu_count()
+        self.dt = dt
+        self.engine = engine
+        self.process_params = {"t_start": 20, "variant": "heat_to_mass", "for_plots": ["mass", "room"]}
+        self.process_params.update(process_params)
+        self.variants = make_variants(grid)
+
+    @property
+    def variants_data(self) -> pd.DataFrame:
+        """Get table of parameters of variants."""
+        return pd.DataFrame([pd.json_normalize(params).iloc[0] for params in self.variants])
+
+    def run(self) -> pd.DataFrame:
+        """
+        Calculate all variants.
+
+        :return: pd.DataFrame indexed by number of variant and time
+        """
+        if not len(self.building.power_data):
+            self.building.update_sun_power()
+        buildings = [self.building.copy(**params) for params in self.variants]
+        aggregates = ["sum_solar_power", "maximum_solar_power", "ind_face"]
+        for b in buildings:
+            b.power_data = b.power_data[[name for name in aggregates if name in b.power_data]]
+            b.power_faces = None
+        if self.engine == "ensemble":
+            return run_ensemble(buildings, self.process_params, self.dt)
+        if self.count_workers == 1:
+            results = [run_variant(b, self.process_params, self.dt) for b in buildings]
+        else:
+            with ProcessPoolExecutor(max_workers=self.count_workers) as pool:
+                futures = [pool.submit(run_variant, b, self.process_params, self.dt) for b in buildings]
+                results = [future.result() for future in futures]
+        return pd.concat(results, keys=range(len(results)), names=["variant", "time"])
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
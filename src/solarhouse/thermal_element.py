@@ -2,6 +2,8 @@ import math
 
 import numpy as np
 
+from .layer_solver import LayerSolver, make_layers
+
 
 class ThermalElement:
     """
@@ -51,6 +53,8 @@ class ThermalElement:
     )
     >>> e.count_layers
     20
+    >>> round(e.max_stable_dt, 1)
+    291.7
     >>> e.dTx_list
     [20.0, 20.0, 20.0, 20.0, 20.0, 20.0, 20.0, 20.0, 20.0, 20.0, 20.0, 20.0,\
  20.0, 20.0, 20.0, 20.0, 20.0, 20.0, 20.0, 20.0]
@@ -69,6 +73,46 @@ class ThermalElement:
     >>> round(e.dTx_list[1], 4)
     20.0002
     >>>
+    Example the same wall computed by vectorized layer solver
+    >>> e = ThermalElement(\
+        name='birch_wall',\
+        temp0=20.0,\
+        density=700.0,\
+        heat_capacity=1250.0,\
+        dx=0.01,\
+        thickness=0.20,\
+        kappa=0.15,\
+        area_inside=1.0,\
+        area_outside=1.1,\
+        vectorized=True\
+    )
+    >>> e.compute(q_enter=1000, dt=1)
+    >>> e.compute(q_enter=1000, dt=1)
+    >>> round(e.dTx_list[0], 3)
+    20.218
+    >>> round(e.dTx_list[1], 4)
+    20.0002
+    >>>
+    Example wall of two layers: insulation with dx = 0.005 m and brick
+    with dx = 0.05 m, it is computed by vectorized layer solver
+    >>> e = ThermalElement(\
+        name='layered_wall',\
+        temp0=20.0,\
+        area_inside=1.0,\
+        area_outside=1.1,\
+        dx=0.05,\
+        layers=[\
+            {'thickness': 0.02, 'kappa': 0.04, 'density': 50, 'heat_capacity': 840, 'dx': 0.005},\
+            {'thickness': 0.2, 'kappa': 0.7, 'density': 1800, 'heat_capacity': 880}]\
+    )
+    >>> e.count_layers
+    8
+    >>> round(e.max_stable_dt, 2)
+    11.55
+    >>> e.compute(q_enter=100, dt=10)
+    >>> round(e.dTx_list[0], 3)
+    24.535
+    >>>
     Example element which implementing  thin layer between two areas
     >>> e = ThermalElement(\
         name='glass',\
@@ -90,18 +134,30 @@ class ThermalElement:
         self.volume = volume
         self.thickness = kwargs.get("thickness", None)
         self.kappa = kwargs.get("kappa", 0.04)
-        self.layers = kwargs.get("layers", {})
+        self.layers = kwargs.get("layers", [])
         self.dx = kwargs.get("dx", None)
         self.area_inside = kwargs.get("area_inside", None)
         self.area_outside = kwargs.get("area_outside", None)
         self.input_alpha = kwargs.get("input_alpha", None)
         self.by_avegare = kwargs.get("by_average", True)
+        self.vectorized = kwargs.get("vectorized", False)
+        self.solver = None
 
         self.branches_loss = []
         self.counter = 0
         self.count_layers = 1
         self.dTx_list = [self.temp]
-        if self.thickness and self.dx:
+        if self.layers:
+            cells, kappa, cm = make_layers(self.layers, self.dx)
+            self.thickness = float(cells.sum())
+            if not self.density or not self.heat_capacity:
+                # average properties of all layers
+                mass = sum(layer["density"] * layer["thickness"] for layer in self.layers)
+                self.density = mass / self.thickness
+                self.heat_capacity = float((cm * cells).sum()) / mass
+            self.count_layers = len(cells)
+            self.dTx_list = list(np.ones(self.count_layers) * self.temp)
+        elif self.thickness and self.dx:
             self.count_layers = int(self.thickness / self.dx)
             self.dTx_list = list(np.ones(self.count_layers) * self.temp)
         self.k_area = None
@@ -111,6 +167,26 @@ class ThermalElement:
                 self.area_average = (self.area_outside + self.area_inside) / 2
             else:
                 self.k_area = (math.sqrt(self.area_outside) - math.sqrt(self.area_inside)) / self.thickness
+        if self.layers or (self.vectorized and self.count_layers > 1):
+            self.solver = LayerSolver.from_element(self)
+
+    @property
+    def dTx_list(self) -> list:
+        """
+        Get temperatures of all dx. If element is computed by the layer
+        solver they are converted from its array only when they are read.
+
+        :return: list of temperatures
+        """
+        if self.solver is not None:
+            return self.solver.temps.tolist()
+        return self.__dTx_list
+
+    @dTx_list.setter
+    def dTx_list(self, value: list) -> None:
+        self.__dTx_list = value
+        if self.solver is not None:
+            self.solver.temps[:] = value
 
     def init_conditions(self, val):
         """Reduction to initial conditions"""
@@ -119,6 +195,8 @@ class ThermalElement:
             new_list.append(val)
         self.dTx_list = new_list
         self.temp = self.dTx_list[0]
+        if self.solver:
+            self.solver.init_conditions(val)
         return
 
     def __get_area_dx(self, iterator):
@@ -158,6 +236,32 @@ class ThermalElement:
             return self.volume * a
         return self.dx * self.__get_area_dx(iterator) * a
 
+    @property
+    def max_stable_dt(self) -> float:
+        """
+        Maximum dt (seconds) when explicit calculation by dx is stable
+        (Courant-Friedrichs-Lewy condition):
+        dt <= dx^2 * density * heat_capacity / (2 * kappa)
+
+        :return: float value of dt or None if element is represented as a point
+        """
+        if self.layers:
+            return self.solver.max_stable_dt
+        if self.count_layers == 1 or not self.heat_capacity or not self.density:
+            return None
+        return self.dx * self.dx * self.density * self.heat_capacity / (2 * self.kappa)
+
+    def get_positions(self) -> np.ndarray:
+        """
+        Get distances of cells by dx from inside face of element.
+
+        :return: array of distances (meters)
+        """
+        if self.layers:
+            cells = make_layers(self.layers, self.dx)[0]
+            return np.concatenate([[0.0], np.cumsum(cells)[:-1]])
+        return np.arange(self.count_layers) * (self.dx or 0)
+
     def calc_loss_input_q(self, t_in: float) -> float:
         """Calculates loss energy between current and previous elements"""
         return self.input_alpha * self.area_inside * (t_in - self.temp)
@@ -167,12 +271,15 @@ class ThermalElement:
         Defines loss energy from current element on dx or from all
         element if it represent in calculation as a point.
         q_loss = alpha*area_branch*(T_current - T_branch)
+        If element is computed by the layer solver then loss is taken from it.
 
         :param iterator: number of dx, 0 if element as a point
         :return: Float value of all loss power
         """
-        temp1 = self.dTx_list[iterator]
-        temp2 = self.dTx_list[iterator + 1]
+        if self.solver is not None:
+            return float(self.solver.get_losses()[iterator])
+        temp1 = self.__dTx_list[iterator]
+        temp2 = self.__dTx_list[iterator + 1]
         if temp1 == temp2:
             return 0.0
         area = self.__get_area_dx(iterator + 1)
@@ -196,12 +303,16 @@ class ThermalElement:
         :return:
             Nothing returns but change temperature in list of
             temperatures by dx in the current point
+            (in array of the layer solver if element is computed by it)
         """
+        if self.solver is not None:
+            self.solver.temps[iterator] += dt * (q_enter - q_loss) / self.solver.capacity[iterator]
+            return
         cm_dx = self.__get_cm_dx(iterator)
         qcm = q_enter - q_loss
         dT = dt * qcm / cm_dx
         if dT:
-            self.dTx_list[iterator] = self.dTx_list[iterator] + dT
+            self.__dTx_list[iterator] = self.__dTx_list[iterator] + dT
         return
 
     def compute(self, q_enter: float, dt: float) -> None:
@@ -216,11 +327,13 @@ class ThermalElement:
         """
         if not self.heat_capacity or not self.density:
             return
+        if self.solver:
+            return self.__compute_vectorized(q_enter, dt)
         for i in range(0, self.count_layers):
             q_loss = 0
             if (i + 1) == self.count_layers:
                 for branch in self.branches_loss:
-                    q = branch.calc_loss_input_q(self.dTx_list[i])
+                    q = branch.calc_loss_input_q(self.__dTx_list[i])
                     branch.compute(q, dt)
                     q_loss += q
             else:
@@ -228,7 +341,137 @@ class ThermalElement:
             self.calc_temp(q_enter, q_loss, i, dt)
             q_enter = q_loss
 
-        self.temp = round(self.dTx_list[0], self.round)
+        self.temp = round(self.__dTx_list[0], self.round)
+
+    def __compute_vectorized(self, q_enter: float, dt: float) -> None:
+        """
+        Calculate temperatures of all dx at once by the layer solver.
+        Layer solver keeps temperatures of element,
+        self.dTx_list is read from it on demand.
+
+        :param q_enter: input power
+        :param dt: range of time
+        :return: change self.temp parameter in the end of calculation
+        """
+        t_last = float(self.solver.temps[-1])
+        q_loss = 0
+        for branch in self.branches_loss:
+            q = branch.calc_loss_input_q(t_last)
+            branch.compute(q, dt)
+            q_loss += q
+        self.solver.step(q_enter, q_loss, dt)
+        self.temp = round(float(self.solver.temps[0]), self.round)
+
+
+class FrozenThermalElement(ThermalElement):
+    """
+    Thermal element with constants of layers calculated once at construction.
+    It has the same interface and gives the same results as ThermalElement,
+    but heat capacity of every dx, area and thermal resistance between
+    neighbouring dx are not calculated again on every step,
+    so the loop by dx only does arithmetic.
+    Parameters of element must not be changed after construction.
+    Example: wall of birch with dx = 0.01 m and 1 kW of power applied.
+
+    >>> e = FrozenThermalElement(\
+        name='birch_wall',\
+        temp0=20.0,\
+        density=700.0,\
+        heat_capacity=1250.0,\
+        dx=0.01,\
+        thickness=0.20,\
+        kappa=0.15,\
+        area_inside=1.0,\
+        area_outside=1.1\
+    )
+    >>> e.compute(q_enter=1000, dt=1)
+    >>> round(e.dTx_list[0], 3)
+    20.109
+    >>> round(e.get_loss_dx(0),3)
+    1.714
+    """
+
+    def __init__(self, name, temp0=None, density=None, heat_capacity=None, volume=None, **kwargs):
+        """Initialize object and calculate constants of layers."""
+        super().__init__(name, temp0, density, heat_capacity, volume, **kwargs)
+        self.cm_dx = None
+        self.area_dx = []
+        self.resistance_dx = []
+        if not self.heat_capacity or not self.density:
+            return
+        if self.count_layers == 1:
+            self.cm_dx = [self.volume * (self.density * self.heat_capacity)]
+            return
+        solver = self.solver or LayerSolver.from_element(self)
+        self.cm_dx = solver.capacity.tolist()
+        self.area_dx = solver.area.tolist()
+        self.resistance_dx = solver.resistance.tolist()
+
+    def get_loss_dx(self, iterator):
+        """
+        Defines loss energy from current dx by constants of layers.
+        q_loss = area*(T_current - T_next)/(dx/kappa)
+
+        :param iterator: number of dx
+        :return: Float value of loss power
+        """
+        if self.solver is not None:
+            return super().get_loss_dx(iterator)
+        temp1 = self.dTx_list[iterator]
+        temp2 = self.dTx_list[iterator + 1]
+        if temp1 == temp2:
+            return 0.0
+        return (self.area_dx[iterator] * (temp1 - temp2)) / self.resistance_dx[iterator]
+
+    def calc_temp(self, q_enter: float, q_loss: float, iterator: int, dt: float) -> None:
+        """
+        Calculates the dT on dt of current point (dx) of element.
+        Tdx = Tdx0 + (q_enter - q_loss)/cmdx
+
+        :param q_enter: enter power from previouse element or source of power
+        :param q_loss: total power loss from current point dx
+        :param iterator: number of current dx
+        :param dt: range of time for calculate
+        """
+        if self.solver is not None:
+            return super().calc_temp(q_enter, q_loss, iterator, dt)
+        dT = dt * (q_enter - q_loss) / self.cm_dx[iterator]
+        if dT:
+            self.dTx_list[iterator] = self.dTx_list[iterator] + dT
+
+    def compute(self, q_enter: float, dt: float) -> None:
+        """
+        Calculate temperatures of all dx by constants of layers.
+
+        :param q_enter: input power
+        :param dt: range of time
+        :return: change self.temp parameter in the end of calculation
+        """
+        if not self.heat_capacity or not self.density:
+            return
+        if self.solver:
+            return super().compute(q_enter, dt)
+        temps = self.dTx_list
+        cm_dx = self.cm_dx
+        area_dx = self.area_dx
+        resistance_dx = self.resistance_dx
+        last = self.count_layers - 1
+        for i in range(self.count_layers):
+            if i == last:
+                q_loss = 0
+                for branch in self.branches_loss:
+                    q = branch.calc_loss_input_q(temps[i])
+                    branch.compute(q, dt)
+                    q_loss += q
+            elif temps[i] == temps[i + 1]:
+                q_loss = 0.0
+            else:
+                q_loss = (area_dx[i] * (temps[i] - temps[i + 1])) / resistance_dx[i]
+            dT = dt * (q_enter - q_loss) / cm_dx[i]
+            if dT:
+                temps[i] = temps[i] + dT
+            q_enter = q_loss
+        self.temp = round(temps[0], self.round)
 
 
 if __name__ == "__main__":
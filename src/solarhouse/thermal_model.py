@@ -1,8 +1,24 @@
+import warnings
+
+import numpy as np
+
+from .thermal_network import ThermalNetwork
+
+
 class ThermalModel:
     """
     Class implements process of calculation of some model
     of thermal object which contains several thermal elements.
     As a result you can take plots of temperatures of some thermal elements.
+    There are two modes of calculation:
+    1. "reference" - every element computes itself and its branches
+       of loss recursively on every dt.
+    2. "compiled" - all elements are compiled into one ThermalNetwork and
+       all steps of calculation are made by matrix operations.
+    Method of integration on dt can be "explicit" (in both modes) or
+    one of implicit methods of ThermalNetwork ("backward_euler",
+    "crank_nicolson", "exponential") which are always computed
+    in compiled mode and allow to use large dt (up to hour).
     """
 
     def __init__(self, name, **kwargs):
@@ -16,6 +32,11 @@ class ThermalModel:
         self.initial_conditions = kwargs.get("initial_conditions", {})
         self.start_element = kwargs.get("start_element", None)
         self.outside_elements = kwargs.get("outside", [])
+        self.mode = kwargs.get("mode", "reference")
+        self.method = kwargs.get("method", "explicit")
+        if self.method not in ThermalNetwork.methods:
+            raise Exception("Unknown method of integration: %s" % self.method, "Error")
+        self.network = None
 
     def show_schema(self):
         """ Shows schema of chain. """
@@ -28,19 +49,135 @@ class ThermalModel:
         for el, val in self.initial_conditions.items():
             self.elements[el].init_conditions(val)
 
-    def start(self, count: int, dt: int, power: float, t_out: float) -> dict:
+    def compile(self) -> ThermalNetwork:
+        """
+        Compile elements of model into single state-space system.
+
+        :return: ThermalNetwork of the model.
+        """
+        self.network = ThermalNetwork.from_elements(self.start_element, self.method)
+        return self.network
+
+    def check_stability(self, dt: float) -> bool:
+        """
+        Check that explicit calculation of elements by dx is stable with dt,
+        warns if dt is above the limit of some node of compiled network.
+        Limits take into account links between elements, not only layers
+        inside of elements.
+
+        :param dt: time for calculation (seconds)
+        :return: True if calculation is stable
+        """
+        if self.method != "explicit":
+            return True
+        network = self.network or ThermalNetwork.from_elements(self.start_element, self.method)
+        limits = network.get_stable_dts()
+        unstable = np.flatnonzero(dt > limits)
+        if not len(unstable):
+            return True
+        worst = unstable[np.argmin(limits[unstable])]
+        name, layer = network.nodes[network.free[worst]]
+        warnings.warn(
+            "dt = %s s is above limit of stability %.2f s of layer %s of element %s, "
+            "decrease dt or use implicit method" % (dt, limits[worst], layer, name),
+            RuntimeWarning,
+        )
+        return False
+
+    def get_max_stable_dt(self) -> float:
+        """
+        Get maximum dt which is stable for all nodes of the model.
+
+        :return: float value of dt (seconds), None if any dt is stable
+        """
+        if self.method != "explicit":
+            return None
+        network = self.network or ThermalNetwork.from_elements(self.start_element, self.method)
+        return network.get_max_stable_dt()
+
+    def get_fixed_temps(self, t_outs) -> np.ndarray:
+        """
+        Get temperatures of fixed nodes of the network for every value
+        of temperature of outside elements.
+
+        :param t_outs: temperatures of outside elements
+        :return: array (values x fixed nodes)
+        """
+        fixed = list(self.network.fixed)
+        outside = [fixed.index(self.network.node_index[(el.name, 0)]) for el in self.outside_elements]
+        temps = np.repeat(self.network.temps[None, self.network.fixed], len(t_outs), axis=0)
+        temps[:, outside] = np.asarray(t_outs, dtype=float)[:, None]
+        return temps
+
+    def solve_steady(self, power: float, t_out: float) -> None:
+        """
+        Set temperatures of elements in steady state with constant
+        input power and temperature of outside elements.
+
+        :param power: input power in first thermal element (Watt)
+        :param t_out: temperature of outside elements
+        """
+        if not self.network:
+            self.compile()
+        for el in self.outside_elements:
+            el.temp = t_out
+        self.network.load_temps()
+        self.network.solve_steady(power)
+        self.network.save_temps()
+
+    def solve_periodic(self, count: int, dt: float, powers, t_outs) -> None:
+        """
+        Set temperatures of elements at begin of periodic steady cycle:
+        after the period of intervals with input powers and temperatures
+        of outside elements temperatures of elements are the same.
+
+        :param count: count of steps in interval
+        :param dt: time of one step (seconds)
+        :param powers: input power in first thermal element for every interval
+        :param t_outs: temperature of outside elements for every interval
+        """
+        if not self.network:
+            self.compile()
+        self.network.load_temps()
+        self.network.solve_periodic(count, dt, powers, self.get_fixed_temps(t_outs))
+        self.network.save_temps()
+
+    def start(self, count: int, dt: int, power: float, t_out: float, recorder=None) -> dict:
         """
 
         :param count: count of calculation
         :param dt: time for calculation (seconds)
         :param power: input power in first thermal element (Watt)
         :param t_out: temperature of last element
+        :param recorder: Recorder of temperatures of elements,
+            calculation is split by its interval of records
         :return:
             dict of data of temperatures of elements.
         """
         for el in self.outside_elements:
             el.temp = t_out
+        while count > 0:
+            steps = count
+            if recorder:
+                steps = min(count, max(1, recorder.steps_to_record(dt)))
+            self.__compute(steps, dt, power)
+            if recorder:
+                recorder.advance(steps * dt)
+            count -= steps
+        return
+
+    def __compute(self, count: int, dt: float, power: float) -> None:
+        """
+        Calculates elements on count steps of dt.
+
+        :param count: count of calculation
+        :param dt: time for calculation (seconds)
+        :param power: input power in first thermal element (Watt)
+        """
+        if self.mode == "compiled" or self.method != "explicit":
+            if not self.network:
+                self.compile()
+            self.network.advance(count, dt, power)
+            return
         for i in range(count):
             self.start_element.compute(power, dt)
-        # TODO  make return data elements by dx for plots
-        return
@@ -0,0 +1,407 @@
+import numpy as np
+from scipy.linalg import expm
+
+from .layer_solver import LayerSolver
+
+
+class ThermalNetwork:
+    """
+    Thermal model compiled into a single state-space system.
+    All thermal elements of the model and their branches of loss are
+    flattened into one list of nodes. Every layer (dx) of element is a node
+    with heat capacity, elements without heat capacity (outside air, etc.)
+    are nodes with fixed temperature.
+    Nodes are connected by matrix of conductances (W/K), so
+    temperatures of all nodes change on dt by one matrix operation:
+    C * dT/dt = q - L * T,
+    where C - vector of heat capacities, q - input power,
+    L - Laplacian of matrix of conductances.
+    Steps can be made by explicit method (the same as in ThermalElement)
+    or by implicit methods which are stable with large dt.
+    Example: 1 cubic meter of water with 1 kW of power applied,
+    which losses power to outside through 1 square meter.
+
+    >>> from solarhouse.thermal_element import ThermalElement
+    >>> water = ThermalElement(\
+        name='cube_water',\
+        temp0=0.0,\
+        density=997,\
+        heat_capacity=4180,\
+        volume=1\
+    )
+    >>> outside = ThermalElement(\
+        name='outside',\
+        temp0=0.0,\
+        area_inside=1.0,\
+        input_alpha=25\
+    )
+    >>> water.branches_loss = [outside]
+    >>> net = ThermalNetwork.from_elements(water)
+    >>> net.nodes
+    [('cube_water', 0), ('outside', 0)]
+    >>> net.conductance
+    array([[ 0., 25.],
+           [25.,  0.]])
+    >>> net.advance(count=1200, dt=3, power=1000)
+    >>> round(water.temp, 3)
+    0.855
+    >>> water.init_conditions(0.0)
+    >>> net = ThermalNetwork.from_elements(water, method='exponential')
+    >>> net.advance(count=1, dt=3600, power=1000)
+    >>> round(water.temp, 3)
+    0.855
+    >>> net.solve_steady(power=1000)
+    array([40.])
+    """
+
+    methods = ("explicit", "backward_euler", "crank_nicolson", "exponential")
+
+    def __init__(
+        self, nodes: list, capacity, conductance, elements: list, input_node: int = 0, method: str = "explicit"
+    ) -> None:
+        """
+        Initialize network.
+
+        :param nodes: list of tuples (name of element, number of dx)
+        :param capacity: vector of heat capacity of nodes (J/K),
+            0 for nodes with fixed temperature
+        :param conductance: symmetric matrix of conductances between nodes
+        :param elements: list of thermal elements in order of nodes
+        :param input_node: number of node where input power comes
+        :param method: method of integration on dt: "explicit",
+            "backward_euler", "crank_nicolson" or "exponential"
+        """
+        self.nodes = nodes
+        self.capacity = np.asarray(capacity, dtype=float)
+        self.conductance = np.asarray(conductance, dtype=float)
+        self.elements = elements
+        self.input_node = input_node
+        self.method = method
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+        kinds = self.capacity.reshape(-1, len(self.nodes))[0]
+        self.free = np.flatnonzero(kinds > 0)
+        self.fixed = np.flatnonzero(kinds <= 0)
+        laplacian = -self.conductance
+        diagonal = np.arange(len(self.nodes))
+        laplacian[..., diagonal, diagonal] += self.conductance.sum(axis=-1)
+        self.laplacian_free = laplacian[..., self.free, :][..., self.free]
+        self.laplacian_fixed = laplacian[..., self.free, :][..., self.fixed]
+        self.capacity_free = self.capacity[..., self.free]
+        self.input_vector = (self.free == self.input_node).astype(float)
+        self.temps = np.zeros(self.capacity.shape)
+        self.__propagators = {}
+
+    @classmethod
+    def from_elements(cls, start_element, method: str = "explicit"):
+        """
+        Compile chain of thermal elements into the network.
+        Elements are collected from start element by branches of loss.
+
+        :param start_element: ThermalElement which takes input power
+        :param method: method of integration on dt
+        :return: ThermalNetwork
+        """
+        elements = []
+        first_nodes = {}
+        links = []
+        nodes = []
+        capacity = []
+
+        def add_element(element):
+            first_nodes[id(element)] = len(nodes)
+            elements.append(element)
+            if not element.heat_capacity or not element.density:
+                nodes.append((element.name, 0))
+                capacity.append(0.0)
+                return
+            if element.count_layers == 1:
+                nodes.append((element.name, 0))
+                capacity.append(element.volume * element.density * element.heat_capacity)
+            else:
+                solver = element.solver or LayerSolver.from_element(element)
+                first = len(nodes)
+                for i in range(element.count_layers):
+                    nodes.append((element.name, i))
+                capacity.extend(solver.capacity)
+                for i, g in enumerate(solver.area / solver.resistance):
+                    links.append((first + i, first + i + 1, g))
+            last = len(nodes) - 1
+            for branch in element.branches_loss:
+                if id(branch) not in first_nodes:
+                    add_element(branch)
+                links.append((last, first_nodes[id(branch)], branch.input_alpha * branch.area_inside))
+
+        add_element(start_element)
+        conductance = np.zeros((len(nodes), len(nodes)))
+        for i, j, g in links:
+            conductance[i, j] += g
+            conductance[j, i] += g
+        return cls(nodes, capacity, conductance, elements, first_nodes[id(start_element)], method)
+
+    def load_temps(self) -> None:
+        """Read temperatures of nodes from thermal elements."""
+        i = 0
+        for element in self.elements:
+            if not element.heat_capacity or not element.density:
+                self.temps[i] = element.temp
+                i += 1
+                continue
+            count = element.count_layers
+            self.temps[i : i + count] = element.dTx_list
+            i += count
+
+    def save_temps(self) -> None:
+        """Write temperatures of nodes into thermal elements."""
+        i = 0
+        for element in self.elements:
+            if not element.heat_capacity or not element.density:
+                i += 1
+                continue
+            count = element.count_layers
+            element.dTx_list = self.temps[i : i + count].tolist()
+            if element.solver:
+                element.solver.temps[:] = self.temps[i : i + count]
+            element.temp = round(element.dTx_list[0], element.round)
+            i += count
+
+    def get_input(self, power) -> np.ndarray:
+        """
+        Calculates power comes into free nodes from source of power
+        and from nodes with fixed temperature.
+
+        :param power: input power in start element (Watt)
+        :return: vector of power for free nodes
+        """
+        power = np.asarray(power, dtype=float)[..., None]
+        return power * self.input_vector - matvec(self.laplacian_fixed, self.temps[..., self.fixed])
+
+    def get_transition(self, dt: float) -> tuple:
+        """
+        Get matrices of transition of free nodes on one dt:
+        T_new = A * T + B * dt * q / C
+        Matrices depend on method of integration, M = L / C:
+        "explicit": A = I - dt * M, B = I;
+        "backward_euler": A = B = (I + dt * M)^-1;
+        "crank_nicolson": B = (I + dt / 2 * M)^-1, A = B * (I - dt / 2 * M);
+        "exponential": A = exp(-dt * M), B = integral of exp(-s * M) on dt / dt.
+        All methods except explicit are stable with any dt.
+
+        :param dt: range of time (seconds)
+        :return: tuple of matrices (A, B)
+        """
+        key = ("transition", dt)
+        if key in self.__propagators:
+            return self.__propagators[key]
+        n = len(self.free)
+        eye = np.eye(n)
+        m = self.laplacian_free / self.capacity_free[..., :, None]
+        if self.method == "explicit":
+            a, b = eye - dt * m, np.broadcast_to(eye, m.shape)
+        elif self.method == "backward_euler":
+            a = b = np.linalg.inv(eye + dt * m)
+        elif self.method == "crank_nicolson":
+            b = np.linalg.inv(eye + dt / 2 * m)
+            a = np.matmul(b, eye - dt / 2 * m)
+        elif self.method == "exponential":
+            augmented = np.zeros(m.shape[:-2] + (2 * n, 2 * n))
+            augmented[..., :n, :n] = -dt * m
+            augmented[..., :n, n:] = eye
+            exp = expm(augmented)
+            a, b = exp[..., :n, :n], exp[..., :n, n:]
+        else:
+            raise Exception("Unknown method of integration: %s" % self.method, "Error")
+        self.__propagators[key] = (a, b)
+        return a, b
+
+    def get_propagator(self, count: int, dt: float) -> tuple:
+        """
+        Get matrices for calculation of count steps by one operation:
+        T_count = P * T + S * dt * q / C,
+        where P = A^count, S = (I + A + ... + A^(count - 1)) * B.
+
+        :param count: count of steps
+        :param dt: range of time of one step
+        :return: tuple (P, S)
+        """
+        key = (count, dt)
+        if key not in self.__propagators:
+            n = len(self.free)
+            a, b = self.get_transition(dt)
+            augmented = np.zeros(a.shape[:-2] + (2 * n, 2 * n))
+            augmented[..., :n, :n] = a
+            augmented[..., :n, n:] = b
+            augmented[..., n:, n:] = np.eye(n)
+            power = np.linalg.matrix_power(augmented, count)
+            self.__propagators[key] = (power[..., :n, :n], power[..., :n, n:])
+        return self.__propagators[key]
+
+    def get_stable_dts(self) -> np.ndarray:
+        """
+        Get maximum dt for explicit method for every free node:
+        dt <= C_i / L_ii, L_ii includes links to neighbouring elements.
+        For ensemble of networks the minimum of all variants is taken.
+
+        :return: array of dt (seconds) in order of self.free
+        """
+        limits = self.capacity_free / np.diagonal(self.laplacian_free, axis1=-2, axis2=-1)
+        return limits.reshape(-1, len(self.free)).min(axis=0)
+
+    def get_max_stable_dt(self) -> float:
+        """
+        Get maximum dt for explicit method when temperatures of all nodes
+        are stable: dt <= C_i / L_ii for every free node.
+
+        :return: float value of dt (seconds)
+        """
+        return float(np.min(self.get_stable_dts()))
+
+    def step(self, dt: float, power) -> None:
+        """
+        Calculates temperatures of all free nodes on one dt.
+
+        :param dt: range of time (seconds)
+        :param power: input power in start element (Watt)
+        :return: change self.temps
+        """
+        a, b = self.get_transition(dt)
+        q = dt * self.get_input(power) / self.capacity_free
+        self.temps[..., self.free] = matvec(a, self.temps[..., self.free]) + matvec(b, q)
+
+    def advance(self, count: int, dt: float, power) -> None:
+        """
+        Calculates temperatures of all nodes after count steps of dt
+        with constant input power and temperatures of fixed nodes.
+        Temperatures are read from thermal elements and written back.
+
+        :param count: count of steps
+        :param dt: range of time of one step (seconds)
+        :param power: input power in start element (Watt)
+        :return: change temperatures of thermal elements
+        """
+        self.load_temps()
+        self.propagate(count, dt, power)
+        self.save_temps()
+
+    def propagate(self, count: int, dt: float, power) -> None:
+        """
+        Calculates temperatures of nodes in self.temps after count steps of dt
+        with constant input power and temperatures of fixed nodes.
+
+        :param count: count of steps
+        :param dt: range of time of one step (seconds)
+        :param power: input power in start element (Watt)
+        :return: change self.temps
+        """
+        p, s = self.get_propagator(count, dt)
+        b = dt * self.get_input(power) / self.capacity_free
+        self.temps[..., self.free] = matvec(p, self.temps[..., self.free]) + matvec(s, b)
+
+    def solve_steady(self, power) -> np.ndarray:
+        """
+        Solve temperatures of free nodes when input power and power from
+        nodes with fixed temperatures are balanced by losses: L * T = q.
+
+        :param power: constant input power in start element (Watt)
+        :return: temperatures of free nodes, self.temps is changed
+        """
+        temps = np.linalg.solve(self.laplacian_free, self.get_input(power)[..., None])[..., 0]
+        self.temps[..., self.free] = temps
+        return temps
+
+    def solve_periodic(self, count: int, dt: float, powers, fixed_temps) -> np.ndarray:
+        """
+        Solve temperatures of free nodes at begin of period which are
+        the same after the period: T(period) = T(0).
+        Period is sequence of intervals of count steps of dt with constant
+        input power and temperatures of fixed nodes in every interval.
+        Temperatures after the period are linear function of temperatures
+        at begin: T(period) = M * T(0) + c, so T(0) = (I - M)^-1 * c.
+
+        :param count: count of steps in interval
+        :param dt: range of time of one step
+        :param powers: input power in start element for every interval
+        :param fixed_temps: temperatures of fixed nodes for every interval
+        :return: temperatures of free nodes, self.temps is changed
+        """
+        p, s = self.get_propagator(count, dt)
+        eye = np.eye(len(self.free))
+        m = np.broadcast_to(eye, p.shape)
+        c = np.zeros(self.capacity_free.shape)
+        for power, temps in zip(powers, fixed_temps):
+            self.temps[..., self.fixed] = temps
+            b = dt * self.get_input(power) / self.capacity_free
+            m = np.matmul(p, m)
+            c = matvec(p, c) + matvec(s, b)
+        temps = np.linalg.solve(eye - m, c[..., None])[..., 0]
+        self.temps[..., self.free] = temps
+        return temps
+
+
+class EnsembleNetwork(ThermalNetwork):
+    """
+    Several thermal networks with the same topology computed together.
+    Capacities, conductances and temperatures of nodes have leading
+    dimension of variant, so all variants change by one matrix operation.
+    Example: two cubes of water with 1 kW of power applied,
+    the second cube losses power to outside through 2 square meters.
+
+    >>> from solarhouse.thermal_element import ThermalElement
+    >>> networks = []
+    >>> for area in (1.0, 2.0):
+    ...     water = ThermalElement(name='water', temp0=0.0, density=997, heat_capacity=4180, volume=1)
+    ...     outside = ThermalElement(name='outside', temp0=0.0, area_inside=area, input_alpha=25)
+    ...     water.branches_loss = [outside]
+    ...     networks.append(ThermalNetwork.from_elements(water))
+    >>> ensemble = EnsembleNetwork(networks)
+    >>> ensemble.temps.shape
+    (2, 2)
+    >>> ensemble.advance(count=1200, dt=3, power=[1000, 1000])
+    >>> [round(network.elements[0].temp, 3) for network in networks]
+    [0.855, 0.845]
+    """
+
+    def __init__(self, networks: list, method: str = None) -> None:
+        """
+        Initialize ensemble.
+
+        :param networks: list of ThermalNetwork with the same nodes and
+            the same nodes with fixed temperature, conductances can be zero
+            in some variants
+        :param method: method of integration on dt,
+            by default method of the first network
+        """
+        first = networks[0]
+        for network in networks[1:]:
+            if (
+                network.nodes != first.nodes
+                or network.input_node != first.input_node
+                or not np.array_equal(network.capacity > 0, first.capacity > 0)
+            ):
+                raise Exception("Thermal networks have different topology", "Error")
+        self.networks = networks
+        capacity = np.stack([network.capacity for network in networks])
+        conductance = np.stack([network.conductance for network in networks])
+        super().__init__(first.nodes, capacity, conductance, first.elements, first.input_node, method or first.method)
+
+    def load_temps(self) -> None:
+        """Read temperatures of nodes from thermal elements of all networks."""
+        for i, network in enumerate(self.networks):
+            network.load_temps()
+            self.temps[i] = network.temps
+
+    def save_temps(self) -> None:
+        """Write temperatures of nodes into thermal elements of all networks."""
+        for i, network in enumerate(self.networks):
+            network.temps[:] = self.temps[i]
+            network.save_temps()
+
+
+def matvec(matrix: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    """Multiply matrices by vectors, both can have leading dimension of variants."""
+    return np.matmul(matrix, vector[..., None])[..., 0]
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
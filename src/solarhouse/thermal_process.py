@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
 
+from . import settings
 from .building import Building
-from .thermal_element import ThermalElement
+from .recorder import Recorder
+from .thermal_element import FrozenThermalElement, ThermalElement
 from .thermal_model import ThermalModel
 
 
@@ -18,7 +21,17 @@ class ThermalProcess:
     """
 
     def __init__(
-        self, t_start: float, building: Building, variant: str = "heat_to_mass", for_plots: list = ["mass"],
+        self,
+        t_start: float,
+        building: Building,
+        variant: str = "heat_to_mass",
+        for_plots: list = ["mass"],
+        vectorized: bool = False,
+        mode: str = "reference",
+        method: str = "explicit",
+        resolution: str = "1h",
+        adaptive: bool = False,
+        frozen: bool = False,
     ) -> None:
         """
         Initialize item of thermal calculation.
@@ -40,25 +53,46 @@ class ThermalProcess:
         This elements can be combined to three variant
         (power to massive object, power to air, power to walls).
         dx for non-homogeneous elements is in meters.
+        Walls and floor with layers of materials (building.wall_layers,
+        building.floor["layers"]) are computed by layers with own dx.
+        If vectorized is True then layers of walls and floor are computed
+        by the array-backed layer solver instead of the loop by dx.
+        mode is mode of calculation of ThermalModel:
+        "reference" or "compiled".
+        method is method of integration on dt: "explicit" or
+        implicit "backward_euler", "crank_nicolson", "exponential".
+        resolution is interval of input data from "1min" to "1h",
+        power of sun and temperature of air are interpolated to it.
+        If adaptive is True then duration of steps is changed by
+        power of sun: long steps at night and short around sunrise
+        and sunset.
+        If frozen is True then elements are FrozenThermalElement with
+        constants of layers calculated once.
         """
         self.count = 0
-        self.seconds = 60
+        self.seconds = pd.Timedelta(resolution).total_seconds()
+        if not 60 <= self.seconds <= 3600:
+            raise Exception("Resolution must be from 1 minute to 1 hour", "Error")
+        self.resolution = resolution
+        self.adaptive = adaptive
         self.building = building
         self.t_start = t_start
         self.elements_for_plots = for_plots
-        self.sun_power_data = self.building.power_data["sum_solar_power"].resample("1h").interpolate()
-        self.weather_data = self.building.weather_data["temp_air"].resample("1h").interpolate()
+        self.sun_power_data = None
+        self.weather_data = None
+        self.load_data()
 
         self.alpha_room = 1 / 0.13
         self.alpha_out = 1 / 0.04
 
         self.dx = 0.005  # meters
+        element_class = FrozenThermalElement if frozen else ThermalElement
         self.heat_accumulator_volume = self.building.heat_accumulator["volume"]
         self.heat_accumulator_density = self.building.get_prop(self.building.heat_accumulator["material"], "density")
         if not self.building.heat_accumulator["volume"]:
             self.heat_accumulator_volume = self.building.heat_accumulator["mass"] / self.heat_accumulator_density
 
-        mass = ThermalElement(
+        mass = element_class(
             name="mass",
             temp0=self.t_start,
             density=self.heat_accumulator_density,
@@ -67,7 +101,7 @@ class ThermalProcess:
             area_inside=self.building.floor_area_inside,
             input_alpha=self.alpha_room,
         )
-        room = ThermalElement(
+        room = element_class(
             name="room",
             temp0=self.t_start,
             density=1.27,
@@ -76,13 +110,13 @@ class ThermalProcess:
             area_inside=self.building.floor_area_inside,
             input_alpha=self.alpha_room,
         )
-        windows = ThermalElement(
+        windows = element_class(
             name="windows",
             temp0=-5,
             area_inside=self.building.windows["area"],
             input_alpha=1 / self.building.windows["therm_r"],
         )
-        floor = ThermalElement(
+        floor = element_class(
             name="floor",
             temp0=18,
             area_inside=self.building.floor_area_inside,
@@ -93,8 +127,10 @@ class ThermalProcess:
             density=self.building.get_prop(self.building.floor["material"], "density"),
             heat_capacity=self.building.get_prop(self.building.floor["material"], "heat_capacity"),
             input_alpha=self.alpha_room,
+            vectorized=vectorized,
+            layers=self.building.get_layers(self.building.floor.get("layers")),
         )
-        walls = ThermalElement(
+        walls = element_class(
             name="walls",
             temp0=self.t_start,
             area_inside=self.building.walls_area_inside,
@@ -105,9 +141,11 @@ class ThermalProcess:
             density=self.building.get_prop(self.building.material, "density"),
             heat_capacity=self.building.get_prop(self.building.material, "heat_capacity"),
             input_alpha=self.alpha_room,
+            vectorized=vectorized,
+            layers=self.building.get_layers(self.building.wall_layers),
         )
 
-        walls_mass = ThermalElement(
+        walls_mass = element_class(
             name="walls_mass",
             temp0=self.t_start,
             dx=self.dx,
@@ -118,11 +156,13 @@ class ThermalProcess:
             density=self.building.get_prop(self.building.material, "density"),
             heat_capacity=self.building.get_prop(self.building.material, "heat_capacity"),
             input_alpha=self.alpha_room,
+            vectorized=vectorized,
+            layers=self.building.get_layers(self.building.wall_layers),
         )
-        outside = ThermalElement(
+        outside = element_class(
             name="outside", temp0=-5, area_inside=self.building.walls_area_outside, input_alpha=self.alpha_out,
         )
-        fl_outside = ThermalElement(
+        fl_outside = element_class(
             name="fl_out",
             temp0=self.building.floor["t_out"],
             area_inside=self.building.floor_area_outside,
@@ -133,7 +173,7 @@ class ThermalProcess:
         walls_mass.branches_loss = [outside]
         floor.branches_loss = [fl_outside]
 
-        self.model = ThermalModel(name=variant)
+        self.model = ThermalModel(name=variant, mode=mode, method=method)
         self.model.elements = {
             "mass": mass,
             "room": room,
@@ -164,32 +204,178 @@ class ThermalProcess:
         elif variant == "heat_to_walls":
             pass
 
-    def run_process(self) -> dict:
+    def load_data(self) -> None:
+        """
+        Load power of sun and temperature of air from the building.
+        It is called again when the building gets data of the next
+        chunk of period, state of thermal elements is kept.
+        """
+        self.sun_power_data = self.building.power_data["sum_solar_power"].resample(self.resolution).interpolate()
+        self.weather_data = self.building.weather_data["temp_air"].resample(self.resolution).interpolate()
+
+    def make_recorder(self, interval: float, elements: list = None, profiles: list = None) -> Recorder:
+        """
+        Make recorder of temperatures of elements for loaded data.
+
+        :param interval: interval of time between records (seconds)
+        :param elements: names of elements for recording of temperature
+        :param profiles: names of elements with layers by dx
+            for recording of temperatures of all layers
+        :return: Recorder
+        """
+        return Recorder(
+            self.model.elements,
+            interval,
+            self.seconds * len(self.sun_power_data),
+            elements=elements,
+            profiles=profiles,
+            start=self.sun_power_data.index[0],
+        )
+
+    def run_process(self, dt: float = 3, dt_max: float = None, recorder: Recorder = None) -> dict:
         """
         Start main calculation process.
         In the end of process it show a plots of temperatures
 
+        :param dt: time of one step of calculation (seconds),
+            with implicit methods it can be up to one hour.
+        :param dt_max: maximum time of one step with adaptive steps
+        :param recorder: Recorder of temperatures of elements
         :return: dict data of elements in house for plots.
         """
-        self.seconds = 60 * 60
-        dt = 3
-        count_dt = int(self.seconds / dt)
+        self.model.check_stability(dt)
+        self.model.make_init_conditions()
+        for name, el in self.model.elements.items():
+            print(name, ": ", el.temp)
+        return self.run_chunk(dt, dt_max, recorder)
+
+    def run_steady(self, power: float = None, t_out: float = None) -> pd.Series:
+        """
+        Calculate temperatures of elements in steady state without
+        calculation of process in time.
+
+        :param power: constant power of sun (Watt), by default average
+            of loaded data
+        :param t_out: constant temperature of air, by default average
+            of loaded data
+        :return: pd.Series of temperatures of elements
+        """
+        if power is None:
+            power = self.sun_power_data.mean()
+        if t_out is None:
+            t_out = self.weather_data.mean()
+        self.model.make_init_conditions()
+        self.model.solve_steady(power, t_out)
+        return pd.Series({name: el.temp for name, el in self.model.elements.items()})
+
+    def run_periodic(self, dt: float = 3) -> pd.DataFrame:
+        """
+        Calculate periodic steady cycle of temperatures, when loaded data
+        (for example one typical day) repeats for ever.
+        Temperatures at begin of cycle are solved directly by compiled
+        network instead of calculation of many periods until influence
+        of initial conditions dies out, then the cycle is calculated.
+        Period is got by get_count_period.
+
+        :param dt: time of one step of calculation (seconds)
+        :return: pd.DataFrame data of elements in house for plots.
+        """
+        self.model.check_stability(dt)
+        self.model.make_init_conditions()
+        count_dt = self.get_count_dt(dt)
+        count_period = self.get_count_period()
+        self.model.solve_periodic(
+            count_dt, dt, self.sun_power_data.values[:count_period], self.weather_data.values[:count_period]
+        )
+        return self.run_chunk(dt, count_intervals=count_period)
+
+    def get_count_period(self) -> int:
+        """
+        Get count of intervals of input data in period of periodic cycle.
+        If data spans whole days (for example 25 hourly points of a day)
+        then the last point closes the period and is not an interval of it.
+
+        :return: count of intervals
+        """
+        index = self.sun_power_data.index
+        span = index[-1] - index[0]
+        if span > pd.Timedelta(0) and span % pd.Timedelta("1D") == pd.Timedelta(0):
+            return len(index) - 1
+        return len(index)
+
+    def get_count_dt(self, dt: float) -> int:
+        """
+        Get count of steps of dt in one interval of input data.
+
+        :param dt: time of one step (seconds)
+        :return: count of steps
+        """
+        count_dt = int(round(self.seconds / dt))
+        if count_dt < 1 or abs(count_dt * dt - self.seconds) > 1e-9 * self.seconds:
+            raise Exception("Interval of %s seconds is not divisible by dt of %s seconds" % (self.seconds, dt), "Error")
+        return count_dt
+
+    def get_steps(self, dt: float, dt_max: float = None) -> list:
+        """
+        Get count and time of steps for every interval of input data.
+        Time of step goes from dt_max, when power of sun does not change
+        (at night), down to dt, when power changes by ADAPTIVE_POWER_CHANGE
+        of its maximum or more. Steps of dt are used around sunrise and
+        sunset. Time of step is interval divided by power of 2, so there
+        are only few different steps, but it is not less than dt.
+
+        :param dt: minimum time of one step (seconds)
+        :param dt_max: maximum time of one step (seconds), by default
+            limit of stability of explicit method or whole interval
+        :return: list of tuples (count of steps, time of step)
+        """
+        if dt_max is None:
+            dt_max = self.model.get_max_stable_dt() or self.seconds
+        dt_max = max(dt, min(dt_max, self.seconds))
+        sun = self.sun_power_data.values
+        following = np.append(sun[1:], sun[-1])
+        change = np.abs(following - sun) / max(sun.max(), 1e-9)
+        ratio = np.clip(change / settings.ADAPTIVE_POWER_CHANGE, 0, 1)
+        durations = dt_max * (dt / dt_max) ** ratio
+        durations[(sun > 0) != (following > 0)] = dt
+        counts = np.minimum(2 ** np.ceil(np.log2(self.seconds / durations)).astype(int), self.get_count_dt(dt))
+        return [(count, self.seconds / count) for count in counts]
+
+    def run_chunk(
+        self, dt: float = 3, dt_max: float = None, recorder: Recorder = None, count_intervals: int = None
+    ) -> pd.DataFrame:
+        """
+        Calculate thermal process for loaded data from current state
+        of thermal elements, so long period can be calculated by chunks.
+
+        :param dt: time of one step of calculation (seconds)
+        :param dt_max: maximum time of one step with adaptive steps
+        :param recorder: Recorder of temperatures of elements
+        :param count_intervals: count of intervals to calculate, None - all,
+            temperatures at points after them are only recorded
+        :return: pd.DataFrame data of elements in house for plots.
+        """
+        if self.adaptive:
+            steps = self.get_steps(dt, dt_max)
+        else:
+            steps = [(self.get_count_dt(dt), dt)] * len(self.sun_power_data)
+        if count_intervals is not None:
+            steps = steps[:count_intervals] + [(0, dt)] * (len(steps) - count_intervals)
+        if recorder and not recorder.count:
+            recorder.record()
         # pd_for_plot = pd.DataFrame(self.sun_power_data)
         pd_for_plot = pd.DataFrame(self.weather_data)
         # pd_for_plot.insert(1, "temp_air", self.weather_data)
         dict_for_plot = {}
-        self.model.make_init_conditions()
-        for name, el in self.model.elements.items():
-            print(name, ": ", el.temp)
         for el_name in self.elements_for_plots:
             dict_for_plot.update({el_name: []})
-        for index in self.sun_power_data.index:
+        for index, (count, step) in zip(self.sun_power_data.index, steps):
             # TODO make progress status
             for el in self.elements_for_plots:
                 dict_for_plot[el].append(self.model.elements[el].temp)
             sun = self.sun_power_data[index]
             t_out = self.weather_data[index]
-            self.model.start(count=count_dt, dt=dt, power=sun, t_out=t_out)
+            self.model.start(count=count, dt=step, power=sun, t_out=t_out, recorder=recorder)
         count = 0
         for k in dict_for_plot.keys():
             count += 1
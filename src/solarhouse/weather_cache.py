@@ -0,0 +1,169 @@
+import hashlib
+import os
+import time
+
+import pandas as pd
+
+
+class WeatherCache:
+    """
+    Class implements cache of weather data on disk.
+    Every fetched period of weather is kept in its own HDF5 file named by
+    key (latitude, longitude, start, end, model) of request.
+    Entries older than ttl are fetched again, the least recently used
+    entries are removed when size of cache is above max_size.
+    In offline mode data is served only from the cache.
+    Example: cache of weather from function which returns constant data.
+
+    >>> import tempfile
+    >>> def fetcher(latitude, longitude, start, end):
+    ...     index = pd.date_range(start=start, end=end, freq='1h')
+    ...     return pd.DataFrame({'temp_air': 20.0}, index=index)
+    >>> cache = WeatherCache(tempfile.mkdtemp(), fetcher=fetcher)
+    >>> start = pd.Timestamp('2019-12-22', tz='Asia/Novosibirsk')
+    >>> end = start + pd.Timedelta(days=1)
+    >>> data = cache.get(54.84, 83.26, start, end)
+    >>> len(data)
+    25
+    >>> cache.has(54.84, 83.26, start, end)
+    True
+    >>> cache.offline = True
+    >>> cache.get(54.84, 83.26, start, end).equals(data)
+    True
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = None,
+        max_size: int = None,
+        offline: bool = False,
+        fetcher=None,
+        model: str = "GFS",
+    ) -> None:
+        """
+        Initialize cache of weather.
+
+        :param path: directory for files of cache
+        :param ttl: time of life of entry (seconds), None - forever
+        :param max_size: maximum size of all files of cache (bytes)
+        :param offline: if True data is served only from the cache
+        :param fetcher: function (latitude, longitude, start, end) which
+            returns pd.DataFrame of weather if data is not in the cache
+        :param model: name of model of forecast for key of entries
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        self.fetcher = fetcher
+        self.model = model
+        os.makedirs(self.path, exist_ok=True)
+
+    def get_file_path(
+        self, latitude: float, longitude: float, start: pd.Timestamp, end: pd.Timestamp, model: str = None
+    ) -> str:
+        """
+        Get path of file of entry for request of weather.
+
+        :param latitude: latitude of building
+        :param longitude: longitude of building
+        :param start: - pd.Timestamp, begin of period
+        :param end: - pd.Timestamp, end of period
+        :param model: name of model of forecast
+        :return: string of path of file
+        """
+        key = "%.6f|%.6f|%s|%s|%s" % (
+            latitude,
+            longitude,
+            pd.Timestamp(start).isoformat(),
+            pd.Timestamp(end).isoformat(),
+            model or self.model,
+        )
+        return os.path.join(self.path, "%s.h5" % hashlib.sha1(key.encode()).hexdigest())
+
+    def has(self, latitude: float, longitude: float, start: pd.Timestamp, end: pd.Timestamp, model: str = None) -> bool:
+        """Check that actual entry for request is in the cache."""
+        file_path = self.get_file_path(latitude, longitude, start, end, model)
+        if not os.path.exists(file_path):
+            return False
+        if self.offline or self.ttl is None:
+            return True
+        return time.time() - self.get_fetched_time(file_path) <= self.ttl
+
+    def get_fetched_time(self, file_path: str) -> float:
+        """Get time when data of entry was fetched."""
+        with pd.HDFStore(file_path, mode="r") as store:
+            return store.get_storer("weather").attrs.fetched
+
+    def get(
+        self,
+        latitude: float,
+        longitude: float,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        model: str = None,
+        fetcher=None,
+    ) -> pd.DataFrame:
+        """
+        Get weather data for period from the cache or from fetcher.
+
+        :param latitude: latitude of building
+        :param longitude: longitude of building
+        :param start: - pd.Timestamp, begin of period
+        :param end: - pd.Timestamp, end of period
+        :param model: name of model of forecast
+        :param fetcher: function for fetch data instead of self.fetcher
+        :return: pd.DataFrame of weather data
+        """
+        file_path = self.get_file_path(latitude, longitude, start, end, model)
+        if self.has(latitude, longitude, start, end, model):
+            os.utime(file_path)
+            return pd.read_hdf(file_path, "weather")
+        if self.offline:
+            raise Exception("Weather data for period %s - %s is not in cache" % (start, end), "Error")
+        fetcher = fetcher or self.fetcher
+        data = fetcher(latitude, longitude, start, end)
+        with pd.HDFStore(file_path, mode="w") as store:
+            store.put("weather", data)
+            store.get_storer("weather").attrs.fetched = time.time()
+        self.evict(keep=file_path)
+        return data
+
+    def evict(self, keep: str = None) -> None:
+        """
+        Remove expired entries and least recently used entries above max_size.
+
+        :param keep: path of file of entry which must not be removed
+        """
+        entries = []
+        for name in os.listdir(self.path):
+            file_path = os.path.join(self.path, name)
+            if not name.endswith(".h5") or file_path == keep:
+                continue
+            if self.ttl is not None and time.time() - self.get_fetched_time(file_path) > self.ttl:
+                os.remove(file_path)
+                continue
+            entries.append((os.path.getmtime(file_path), os.path.getsize(file_path), file_path))
+        if self.max_size is None:
+            return
+        size = sum(entry[1] for entry in entries)
+        if keep:
+            size += os.path.getsize(keep)
+        for mtime, file_size, file_path in sorted(entries):
+            if size <= self.max_size:
+                break
+            os.remove(file_path)
+            size -= file_size
+
+    def clear(self) -> None:
+        """Remove all entries of the cache."""
+        for name in os.listdir(self.path):
+            if name.endswith(".h5"):
+                os.remove(os.path.join(self.path, name))
+
+
+if __name__ == "__main__":
+    import doctest
+
+    doctest.testmod()
@@ -1,5 +1,7 @@
 import os
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from solarhouse.building import Building
@@ -44,3 +46,39 @@ def building(mesh_file_path):
         mesh_file=mesh_file_path, geo=geo, wall_thickness=0.3, wall_material="birch", properties_materials=material,
     )
     return ret
+
+
+@pytest.fixture
+def building_with_data(mesh_file_path):
+    """Create building with one day of sun power and weather data."""
+    geo = {"latitude": 54.841426, "longitude": 83.264479}
+    ret = Building(
+        mesh_file=mesh_file_path,
+        geo=geo,
+        wall_material="adobe",
+        wall_thickness=0.3,
+        efficiency=75,
+        heat_accumulator={"volume": 0.032, "material": "water"},
+        windows={"area": 0.3, "therm_r": 5.0},
+        floor={"area": 1.0, "material": "adobe", "thickness": 0.2, "t_out": 4.0},
+    )
+    index = pd.date_range(start="2019-12-22", periods=24, freq="1h", tz="Asia/Novosibirsk")
+    hours = np.arange(24)
+    sun = np.clip(np.sin((hours - 6) * np.pi / 12), 0, None) * 300
+    ret.weather_data = pd.DataFrame({"temp_air": -10 + 5 * np.sin((hours - 9) * np.pi / 12)}, index=index)
+    ret.power_data = pd.DataFrame({"sum_solar_power": sun}, index=index)
+    return ret
+
+
+@pytest.fixture
+def make_building_in_summer(mesh_file_path):
+    """Create buildings with clear sky weather of a summer day, arguments are passed to the building."""
+
+    def make(mesh_file=None, periods=25, **kwargs):
+        geo = {"latitude": 54.841426, "longitude": 83.264479}
+        ret = Building(mesh_file=mesh_file or mesh_file_path, geo=geo, **kwargs)
+        index = pd.date_range(start="2019-06-22", periods=periods, freq="1h", tz="Asia/Novosibirsk")
+        ret.weather_data = ret.location.get_clearsky(index)
+        return ret
+
+    return make
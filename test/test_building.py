@@ -1,3 +1,19 @@
+import copy
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+import trimesh
+
+from solarhouse import building as building_module
+from solarhouse import settings
+from solarhouse.building import Building, properties_materials
+from solarhouse.mesh_cache import MeshCache
+from solarhouse.shading import Shading
+
+
 def test_thickness(building):
     assert building.wall_thickness == 0.3
 
@@ -44,3 +60,258 @@ def test_perimeter_floor(building):
     assert round(building.volume_air_inside, 3) == 0.044
     assert building.get_perimeter_floor("outside") == 4.0
     assert round(building.area_mass_walls_outside, 3) == 1.7
+
+
+def test_batched_irradiance(make_building_in_summer):
+    """Batched engine gives the same sun power on faces as pvlib ModelChain."""
+    power_data = []
+    for engine in ("modelchain", "batched"):
+        b = make_building_in_summer(irradiance_engine=engine)
+        b.weather_data["temp_air"] = 20
+        b.calc_sun_power_on_faces()
+        power_data.append(b.power_data)
+    assert np.allclose(power_data[0]["sum_solar_power"], power_data[1]["sum_solar_power"])
+    assert (power_data[0]["ind_face"] == power_data[1]["ind_face"]).all()
+
+
+def test_parallel_calc(make_building_in_summer):
+    """Parallel calculation of faces gives the same sun power on faces in order of faces."""
+    power_data = []
+    for count_faces in (100, 1):
+        b = make_building_in_summer(count_faces_for_parallel_calc=count_faces, count_workers=2)
+        b.weather_data["temp_air"] = 20
+        b.calc_sun_power_on_faces()
+        power_data.append(b.power_data)
+    assert power_data[0].equals(power_data[1])
+
+
+def test_parallel_calc_by_chunks(make_building_in_summer, monkeypatch):
+    """Small mesh is calculated in this process by default, one pool of processes is used for all chunks of faces."""
+    pools = []
+
+    class Pool(ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(building_module, "ProcessPoolExecutor", Pool)
+    monkeypatch.setattr(settings, "COUNT_FACES_IN_CHUNK", 4)
+    totals = []
+    for parallel in (False, True):
+        b = make_building_in_summer(count_workers=2, compact_power=True)
+        assert b.count_faces_for_parallel_calc > len(b.mesh.faces)
+        if parallel:
+            b.count_faces_for_parallel_calc = len(b.mesh.faces)
+        b.weather_data["temp_air"] = 20
+        b.calc_sun_power_on_faces()
+        totals.append(b.power_data["sum_solar_power"])
+    assert len(pools) == 1
+    assert totals[0].equals(totals[1])
+
+
+def test_group_orientations(make_building_in_summer):
+    """Sun power on faces calculated by groups of orientations is the same as calculated by faces."""
+    power_data = []
+    for group, by_faces in ((False, False), (True, True), (True, False)):
+        b = make_building_in_summer(irradiance_engine="batched", group_orientations=group, power_by_faces=by_faces)
+        b.calc_sun_power_on_faces()
+        power_data.append(b.power_data)
+    assert b.power_groups.shape[1] < len(b.mesh.faces)
+    assert np.allclose(power_data[0], power_data[1])
+    assert list(power_data[2].columns) == ["sum_solar_power", "maximum_solar_power", "ind_face"]
+    for name in ("sum_solar_power", "maximum_solar_power"):
+        assert np.allclose(power_data[0][name], power_data[2][name])
+    day = power_data[0]["maximum_solar_power"] > 0
+    assert (power_data[0]["ind_face"][day] == power_data[2]["ind_face"][day]).all()
+    assert np.allclose(b.get_power_faces(), power_data[0][list(range(len(b.mesh.faces)))])
+
+
+def test_compact_power(make_building_in_summer, tmpdir):
+    """Compact float32 storage of power on faces gives the same aggregates as table of faces."""
+    power_data = []
+    for params in ({}, {"compact_power": True, "power_path": os.path.join(str(tmpdir), "power.dat")}):
+        b = make_building_in_summer(irradiance_engine="batched", **params)
+        b.calc_sun_power_on_faces()
+        power_data.append(b.power_data)
+    assert isinstance(b.power_faces, np.memmap)
+    assert b.power_faces.dtype == np.float32
+    assert list(power_data[1].columns) == ["sum_solar_power", "maximum_solar_power", "ind_face"]
+    assert np.allclose(power_data[0]["sum_solar_power"], power_data[1]["sum_solar_power"], rtol=1e-5)
+    assert np.allclose(b.get_power_faces(), power_data[0][list(range(len(b.mesh.faces)))], rtol=1e-5)
+
+
+def test_aggregate_only(make_building_in_summer, monkeypatch):
+    """Aggregates accumulated by chunks of faces are the same as calculated from table of faces."""
+    monkeypatch.setattr(settings, "COUNT_FACES_IN_CHUNK", 5)
+    power_data = []
+    for aggregate_only in (False, True):
+        b = make_building_in_summer(irradiance_engine="batched", aggregate_only=aggregate_only)
+        b.calc_sun_power_on_faces()
+        power_data.append(b.power_data)
+    assert list(power_data[1].columns) == ["sum_solar_power", "maximum_solar_power", "ind_face"]
+    assert b.power_faces is None
+    assert np.allclose(power_data[0]["sum_solar_power"], power_data[1]["sum_solar_power"])
+    assert np.allclose(power_data[0]["maximum_solar_power"], power_data[1]["maximum_solar_power"])
+    assert (power_data[0]["ind_face"] == power_data[1]["ind_face"]).all()
+
+
+def test_update_sun_power(make_building_in_summer):
+    """Power of sun is calculated again only if attributes which it depends on are changed."""
+    b = make_building_in_summer(irradiance_engine="batched")
+    index = b.weather_data.index
+    assert b.update_sun_power()
+    b.weather_data = b.location.get_clearsky(index)
+    assert not b.update_sun_power()
+    assert "temp_air" in b.weather_data
+    b.weather_data["temp_air"] = 30
+    assert b.update_sun_power()
+    b.weather_data["pressure"] = 90000
+    assert b.update_sun_power()
+    b.windows["therm_r"] = 2.0
+    b.heat_accumulator["volume"] = 0.1
+    assert not b.update_sun_power()
+    variant = b.copy(floor={"material": "birch"})
+    assert not variant.update_sun_power()
+    b.efficiency = 80
+    assert b.update_sun_power()
+
+
+def test_mesh_inside_tracks_wall_thickness(building):
+    volume = building.mesh_inside.volume
+    building.wall_thickness = 0.25
+    assert building.mesh_inside.volume > volume
+    building.wall_thickness = 0.3
+    assert round(building.mesh_inside.volume, 3) == 0.064
+
+
+def test_face_orientations(mesh_file_path):
+    """Table of orientations is the same as orientations of every face and is built once per mesh."""
+    building = Building(mesh_file=mesh_file_path, geo={"latitude": 54.841426, "longitude": 83.264479})
+    table = building.face_orientations
+    assert list(table.columns) == ["area", "normal_x", "normal_y", "normal_z", "tilt", "azimuth"]
+    for i, face in enumerate(building.mesh.faces):
+        area, tilt, azimuth = building.get_face_orientation(face)
+        assert (table.area[i], table.tilt[i], table.azimuth[i]) == (area, tilt, azimuth)
+    assert building.face_orientations is table
+    building.mesh.apply_scale(2)
+    assert building.face_orientations is not table
+    assert round(building.face_orientations.area.sum() / table.area.sum(), 6) == 4
+
+
+def test_geometry_cache(mesh_file_path):
+    """Geometric properties are cached until attributes which they depend on are changed."""
+    materials = copy.deepcopy(properties_materials)
+    building = Building(
+        mesh_file=mesh_file_path, geo={"latitude": 54.841426, "longitude": 83.264479}, properties_materials=materials
+    )
+    perimeter = building.get_perimeter_floor("outside")
+    area = building.walls_area_outside
+    building.windows["area"] = 0.5
+    assert building.walls_area_outside == area - 0.5
+    assert building.get_perimeter_floor("outside") == perimeter
+    building.wall_thickness = 0.25
+    assert building.floor_area_inside > 0.16
+    building.heat_accumulator = {"volume": 0, "mass": 2e-5, "material": "water"}
+    volume = building.volume_air_inside
+    building.dict_properties_materials["water"]["density"] = 0.5
+    assert building.volume_air_inside > volume
+
+
+def test_floor_of_tilted_mesh(mesh_file_path):
+    """Faces of floor of slightly tilted mesh are found with tolerance."""
+    building = Building(mesh_file=mesh_file_path, geo={"latitude": 54.841426, "longitude": 83.264479})
+    area = building.floor_area_outside
+    matrix = trimesh.transformations.rotation_matrix(math.radians(0.1), [1, 0, 0])
+    building.mesh.apply_transform(matrix)
+    assert round(building.floor_area_outside, 6) == area
+    building.floor_tolerance = 0.01
+    assert building.floor_area_outside == 0
+
+
+def test_mesh_cache(mesh_file_path, tmpdir):
+    """Preprocessed mesh is loaded from file of cache without parsing of file of the mesh."""
+    geo = {"latitude": 54.841426, "longitude": 83.264479}
+    b = Building(mesh_file=mesh_file_path, geo=geo, mesh_cache=MeshCache(path=str(tmpdir)))
+    assert b.mesh_inside.is_watertight
+    assert len(os.listdir(str(tmpdir))) == 2
+    cache = MeshCache(path=str(tmpdir))
+    mesh = cache.get_mesh(b.mesh_key, None)
+    assert (mesh.vertices == b.mesh.vertices).all()
+    other = Building(mesh_file=mesh_file_path, geo=geo, mesh_cache=cache)
+    reference = Building(mesh_file=mesh_file_path, geo=geo, mesh_cache=None)
+    for name in ("floor_area_outside", "floor_area_inside", "walls_area_inside", "volume_air_inside"):
+        assert getattr(other, name) == getattr(reference, name)
+    assert (other.mesh_inside.vertices == reference.mesh_inside.vertices).all()
+
+
+def write_l_shaped_mesh(path: str) -> str:
+    """Write file of mesh of L-shaped building 2x2x1 with wings of width 1."""
+    points = [(0, 0), (2, 0), (2, 1), (1, 1), (1, 2), (0, 2)]
+    fan = [(1, 3, 2), (1, 4, 3), (1, 5, 4), (1, 6, 5)]
+    faces = fan + [(a + 6, c + 6, b + 6) for a, b, c in fan]
+    for i in range(6):
+        j = (i + 1) % 6
+        faces.append((i + 1, j + 1, j + 7, i + 7))
+    mesh_file = os.path.join(path, "l_shaped.obj")
+    with open(mesh_file, "w") as file:
+        for z in (0, 1):
+            file.writelines("v %s %s %s\n" % (x, y, z) for x, y in points)
+        file.writelines("f %s\n" % " ".join(map(str, face)) for face in faces)
+    return mesh_file
+
+
+def test_offset_of_l_shaped_building(tmpdir):
+    """Inside mesh of L-shaped building is offset by thickness of walls."""
+    mesh_file = write_l_shaped_mesh(str(tmpdir))
+    geo = {"latitude": 54.841426, "longitude": 83.264479}
+    b = Building(mesh_file=mesh_file, geo=geo, wall_thickness=0.1, inside_method="offset")
+    assert round(b.mesh_inside.volume, 6) == 1.792
+    assert round(b.floor_area_inside, 6) == 2.24
+    assert round(b.get_perimeter_floor("inside"), 6) == 7.2
+    scaled = b.copy(inside_method="scale")
+    assert round(scaled.floor_area_inside, 6) != 2.24
+    assert b.copy(inside_resolution=0.3).mesh_inside.volume == pytest.approx(1.792)
+
+
+def test_shading(make_building_in_summer, mesh_file_path, tmpdir, monkeypatch):
+    """Faces of L-shaped building are shaded by its wings, faces of box are not."""
+    l_shaped_file = write_l_shaped_mesh(str(tmpdir))
+    totals = {}
+    for mesh_file in (mesh_file_path, l_shaped_file):
+        for engine in ("batched", "modelchain"):
+            for shading in (False, True):
+                b = make_building_in_summer(mesh_file, periods=24, irradiance_engine=engine, shading=shading)
+                b.update_sun_power()
+                totals[mesh_file, engine, shading] = b.power_data["sum_solar_power"].values
+    l_shaped = make_building_in_summer(l_shaped_file, shading=True)
+    shading = l_shaped.get_shading()
+    sunlit = shading.calc_sunlit(shading.get_direction(60, 315))
+    assert not sunlit.all()
+    assert (l_shaped.face_orientations.normal_y[~sunlit] == 1).all()
+    for engine in ("batched", "modelchain"):
+        assert (totals[mesh_file_path, engine, True] == totals[mesh_file_path, engine, False]).all()
+        assert totals[l_shaped_file, engine, True].sum() < totals[l_shaped_file, engine, False].sum()
+    assert np.allclose(totals[l_shaped_file, "batched", True], totals[l_shaped_file, "modelchain", True], rtol=1e-3)
+
+    monkeypatch.setattr(settings, "COUNT_FACES_IN_CHUNK", 4)
+    for params in ({"aggregate_only": True}, {"compact_power": True}):
+        b = make_building_in_summer(l_shaped_file, periods=24, irradiance_engine="batched", shading=True, **params)
+        b.update_sun_power()
+        assert 0 < len(b.get_shading()) < 24
+        assert np.allclose(b.power_data["sum_solar_power"], totals[l_shaped_file, "batched", True], rtol=1e-5)
+
+
+def test_shading_candidates(tmpdir, monkeypatch):
+    """Rays tested only with candidate triangles shade the same faces as rays tested with all triangles."""
+    mesh = trimesh.load(write_l_shaped_mesh(str(tmpdir))).subdivide()
+    shading = Shading(mesh)
+    directions = [shading.get_direction(zenith, azimuth) for zenith in (0, 30, 60, 85) for azimuth in range(0, 360, 45)]
+    fast = [shading.calc_sunlit(direction) for direction in directions]
+    assert any(not sunlit.all() for sunlit in fast)
+
+    def get_all_pairs(self, direction, rays, triangles):
+        return rays.repeat(len(triangles)), np.tile(triangles, len(rays))
+
+    monkeypatch.setattr(Shading, "get_candidates", get_all_pairs)
+    for direction, sunlit in zip(directions, fast):
+        assert (shading.calc_sunlit(direction) == sunlit).all()
@@ -1,8 +1,13 @@
+import datetime
 import os
 import filecmp
 
+import pandas as pd
+
 from solarhouse.building import Building
 from solarhouse.calculation import Calculation
+from solarhouse.checkpoint import get_checkpoint_time, save_checkpoint
+from solarhouse.thermal_process import ThermalProcess
 import solarhouse.export as export
 
 
@@ -39,3 +44,65 @@ def test_main(mesh_file_path, tmpdir):
 
     export.as_html(data_frame, output_dir)
     assert os.path.exists(os.path.join(output_dir, "plots.html"))
+
+
+def test_stream(mesh_file_path, tmpdir):
+    tz = "Asia/Novosibirsk"
+    geo = {"latitude": 54.841426, "longitude": 83.264479}
+    building = Building(
+        mesh_file=mesh_file_path,
+        geo=geo,
+        wall_material="adobe",
+        wall_thickness=0.3,
+        efficiency=75,
+        heat_accumulator={"volume": 0.032, "material": "water"},
+        windows={"area": 0.3, "therm_r": 5.0},
+        floor={"area": 1.0, "material": "adobe", "thickness": 0.2, "t_out": 4.0},
+    )
+    calc = Calculation(tz=tz, geo=geo, building=building)
+    data_frame = calc.compute(date=22, month=12, year=2019, with_weather=False)
+    chunks = list(calc.compute_stream(date=22, month=12, year=2019, with_weather=False, chunk="6h"))
+    assert len(chunks) == 5
+    assert pd.concat(chunks).equals(data_frame)
+
+    res_file = export.as_file_by_chunks(iter(chunks), "csv", tmpdir)
+    assert pd.read_csv(res_file, index_col=0).shape == data_frame.shape
+
+
+def test_resume_from_checkpoint(mesh_file_path, tmpdir):
+    tz = "Asia/Novosibirsk"
+    geo = {"latitude": 54.841426, "longitude": 83.264479}
+    building = Building(
+        mesh_file=mesh_file_path,
+        geo=geo,
+        wall_material="adobe",
+        wall_thickness=0.3,
+        efficiency=75,
+        heat_accumulator={"volume": 0.032, "material": "water"},
+        windows={"area": 0.3, "therm_r": 5.0},
+        floor={"area": 1.0, "material": "adobe", "thickness": 0.2, "t_out": 4.0},
+    )
+    calc = Calculation(tz=tz, geo=geo, building=building)
+    period = (datetime.datetime(2019, 12, 22), datetime.datetime(2019, 12, 23, 12))
+    expected = calc.compute(period=period, with_weather=False)
+
+    checkpoint = os.path.join(str(tmpdir), "state.npz")
+    calc.compute(date=22, month=12, year=2019, with_weather=False, checkpoint=checkpoint)
+    data_frame = calc.compute(period=period, with_weather=False, checkpoint=checkpoint)
+    assert len(data_frame) == 12
+    assert data_frame.equals(expected.iloc[-12:])
+
+    with open(checkpoint, "rb") as file:
+        state = file.read()
+    data_frame = calc.compute(period=period, with_weather=False, checkpoint=checkpoint)
+    assert data_frame.empty
+    assert list(data_frame.columns) == list(expected.columns)
+    with open(checkpoint, "rb") as file:
+        assert file.read() == state
+
+    model = ThermalProcess(t_start=20, building=building, variant="heat_to_mass").model
+    model.make_init_conditions()
+    save_checkpoint(model, checkpoint)
+    assert get_checkpoint_time(checkpoint) is None
+    data_frame = calc.compute(period=period, with_weather=False, checkpoint=checkpoint)
+    assert data_frame.equals(expected)
@@ -0,0 +1,50 @@
+import pandas as pd
+from pvlib.location import Location
+
+from solarhouse.solar_cache import SolarCache
+
+location = Location(latitude=54.841426, longitude=83.264479)
+index = pd.date_range(start="2019-06-22", periods=24, freq="1h", tz="Asia/Novosibirsk")
+
+
+def test_lru():
+    cache = SolarCache(max_entries=2)
+    cache.get_clearsky(location, index)
+    cache.get_clearsky(location, index, model="haurwitz")
+    cache.get_clearsky(location, index)
+    cache.get_solarposition(location, index)
+    assert len(cache) == 2
+    keys = list(cache.entries)
+    assert keys[0] == cache.get_key("clearsky", location, index, "ineichen")
+
+
+def test_key():
+    cache = SolarCache()
+    temperature = pd.Series(20.0, index=index)
+    key = cache.get_key("solarposition", location, index, "nrel_numpy", temperature)
+    assert key != cache.get_key("solarposition", location, index, "nrel_numpy", temperature + 1)
+    assert key != cache.get_key("solarposition", location, index[:-1], "nrel_numpy", temperature)
+    assert key != cache.get_key("solarposition", Location(latitude=55, longitude=83), index, "nrel_numpy", temperature)
+
+
+def test_disk(tmpdir):
+    clear_sky = SolarCache(path=str(tmpdir)).get_clearsky(location, index)
+    cache = SolarCache(path=str(tmpdir))
+    key = cache.get_key("clearsky", location, index, "ineichen")
+    assert cache.get(key, calc=None).equals(clear_sky)
+
+
+def test_empty_cache_of_building(make_building_in_summer, monkeypatch):
+    """Empty cache passed to the building is used too."""
+    cache = SolarCache()
+    b = make_building_in_summer(periods=24, irradiance_engine="batched", solar_cache=cache)
+    b.calc_sun_power_on_faces()
+    assert len(cache) > 0
+    power = b.power_data["sum_solar_power"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("position of sun is calculated again")
+
+    monkeypatch.setattr(b.location, "get_solarposition", fail)
+    b.calc_sun_power_on_faces()
+    assert b.power_data["sum_solar_power"].equals(power)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from solarhouse.sweep import Sweep
+from solarhouse.thermal_process import ThermalProcess
+
+
+def test_sweep(building_with_data):
+    grid = {"wall_thickness": [0.25, 0.3], "windows.area": [0.3, 0.5], "efficiency": [75]}
+    sweep = Sweep(building_with_data, grid, count_workers=2, mode="compiled")
+    data = sweep.run()
+    assert list(data.index.names) == ["variant", "time"]
+    assert len(data) == 4 * len(building_with_data.power_data)
+    assert list(sweep.variants_data.columns) == ["wall_thickness", "efficiency", "windows.area"]
+    assert building_with_data.wall_thickness == 0.3
+    assert building_with_data.windows["area"] == 0.3
+
+    variant = building_with_data.copy(wall_thickness=0.25, windows={"area": 0.5})
+    process = ThermalProcess(t_start=20, building=variant, for_plots=["mass", "room"], mode="compiled")
+    expected = process.run_process()
+    assert np.allclose(data.loc[1][["mass", "room"]], expected[["mass", "room"]])
+
+
+def test_copy_efficiency(building_with_data):
+    variant = building_with_data.copy(efficiency=150)
+    sun = building_with_data.power_data["sum_solar_power"]
+    assert np.allclose(variant.power_data["sum_solar_power"], sun * 2)
+
+
+def test_sweep_ensemble(building_with_data):
+    grid = {"wall_thickness": [0.25, 0.3], "windows.area": [0.3, 0.5], "material": ["adobe", "birch"]}
+    data = Sweep(building_with_data, grid, engine="ensemble", mode="compiled").run()
+    expected = Sweep(building_with_data, grid, count_workers=1, mode="compiled").run()
+    assert data.index.equals(expected.index)
+    assert np.allclose(data[["mass", "room"]], expected[["mass", "room"]])
+
+    grid = {"windows.area": [0.0, 0.5]}
+    data = Sweep(building_with_data, grid, engine="ensemble", mode="compiled").run()
+    expected = Sweep(building_with_data, grid, count_workers=1, mode="compiled").run()
+    assert np.allclose(data[["mass", "room"]], expected[["mass", "room"]])
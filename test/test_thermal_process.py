@@ -0,0 +1,198 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import trimesh
+
+from solarhouse.building import Building
+from solarhouse.checkpoint import get_checkpoint_time, load_checkpoint, save_checkpoint
+from solarhouse.thermal_process import ThermalProcess
+
+
+def test_compiled_as_reference(building_with_data):
+    """Compiled thermal network gives the same temperatures as reference mode."""
+    results = []
+    for mode in ("reference", "compiled"):
+        process = ThermalProcess(t_start=20, building=building_with_data, for_plots=["mass", "room"], mode=mode)
+        results.append(process.run_process())
+    assert np.allclose(results[0][["mass", "room"]], results[1][["mass", "room"]], atol=1e-3)
+
+
+def test_exponential_with_hour_step(building_with_data):
+    """Exponential method with one step per hour gives the same temperatures as explicit method."""
+    process = ThermalProcess(t_start=20, building=building_with_data, for_plots=["mass", "room"], mode="compiled")
+    reference = process.run_process()
+    process = ThermalProcess(t_start=20, building=building_with_data, for_plots=["mass", "room"], method="exponential")
+    result = process.run_process(dt=3600)
+    assert np.allclose(reference[["mass", "room"]], result[["mass", "room"]], atol=1e-2)
+
+
+def test_warning_unstable_dt(building_with_data):
+    """Explicit method warns if dt is above limit of stability."""
+    process = ThermalProcess(t_start=20, building=building_with_data, mode="compiled")
+    with pytest.warns(RuntimeWarning):
+        assert not process.model.check_stability(100)
+    assert process.model.check_stability(3)
+
+
+def test_unstable_link_of_elements(building_with_data, tmpdir):
+    """Links between elements limit stability, layers of every element are stable with dt."""
+    mesh_file = os.path.join(str(tmpdir), "box.obj")
+    trimesh.creation.box(extents=(4, 4, 3)).export(mesh_file)
+    building = Building(
+        mesh_file=mesh_file,
+        geo={"latitude": 54.841426, "longitude": 83.264479},
+        wall_material="adobe",
+        wall_thickness=0.3,
+        efficiency=75,
+        heat_accumulator={"volume": 0.032, "material": "water"},
+        windows={"area": 0.3, "therm_r": 5.0},
+        floor={"area": 1.0, "material": "adobe", "thickness": 0.2, "t_out": 4.0},
+    )
+    building.weather_data = building_with_data.weather_data
+    building.power_data = building_with_data.power_data
+    process = ThermalProcess(t_start=20, building=building, mode="compiled")
+    elements = process.model.elements.values()
+    assert all(el.max_stable_dt is None or el.max_stable_dt > 3 for el in elements)
+    assert process.model.get_max_stable_dt() < 3
+    with pytest.warns(RuntimeWarning, match="element walls_mass"):
+        assert not process.model.check_stability(3)
+
+
+def test_invalid_parameters(building_with_data):
+    """Unknown method and dt which does not divide interval of data are rejected."""
+    with pytest.raises(Exception, match="Unknown method"):
+        ThermalProcess(t_start=20, building=building_with_data, method="runge_kutta")
+    process = ThermalProcess(t_start=20, building=building_with_data, mode="compiled")
+    with pytest.raises(Exception, match="not divisible"):
+        process.run_process(dt=7)
+
+
+def test_resolution(building_with_data):
+    """Input data is interpolated to resolution of process."""
+    process = ThermalProcess(t_start=20, building=building_with_data, mode="compiled", resolution="15min")
+    result = process.run_process()
+    assert len(result) == 4 * 23 + 1
+    with pytest.raises(Exception):
+        ThermalProcess(t_start=20, building=building_with_data, resolution="2h")
+
+
+def test_adaptive_steps(building_with_data):
+    """Adaptive steps of explicit method give the same temperatures as fine uniform steps with fewer steps."""
+    params = {"t_start": 20, "building": building_with_data, "for_plots": ["mass", "room"], "resolution": "15min"}
+    reference = ThermalProcess(mode="compiled", **params).run_process(dt=1)
+    process = ThermalProcess(mode="compiled", adaptive=True, **params)
+    result = process.run_process(dt=3)
+    steps = process.get_steps(3)
+    assert sum(count for count, step in steps) < len(steps) * 900 / 3
+    assert min(step for count, step in steps) == 3
+    assert max(step for count, step in steps) <= process.model.get_max_stable_dt()
+    assert np.allclose(reference[["mass", "room"]], result[["mass", "room"]], atol=1e-2)
+
+
+def test_recorder(building_with_data):
+    """Recorder samples temperatures and profiles of layers at its interval."""
+    for mode in ("reference", "compiled"):
+        process = ThermalProcess(t_start=20, building=building_with_data, for_plots=["mass", "room"], mode=mode)
+        recorder = process.make_recorder(interval=600, elements=["mass", "room"], profiles=["wall"])
+        result = process.run_process(recorder=recorder)
+        data = recorder.get_data()
+        assert len(data) == 24 * 6 + 1
+        assert np.allclose(data.loc[result.index, ["mass", "room"]], result[["mass", "room"]])
+        profile = recorder.get_profile("wall")
+        assert profile.shape == (24 * 6 + 1, process.model.elements["wall"].count_layers)
+        assert profile.values[-1].tolist() == process.model.elements["wall"].dTx_list
+
+
+def test_frozen_elements(building_with_data):
+    """Frozen elements give the same temperatures as regular elements."""
+    results = []
+    for frozen in (False, True):
+        process = ThermalProcess(
+            t_start=20, building=building_with_data, for_plots=["mass", "room"], frozen=frozen, vectorized=False
+        )
+        results.append(process.run_process())
+    assert results[0].equals(results[1])
+
+
+def test_wall_layers(building_with_data):
+    """Walls and floor of layers of materials are computed in reference and compiled modes."""
+    layers = [
+        {"material": "plaster", "thickness": 0.02},
+        {"material": "brick", "thickness": 0.2, "dx": 0.02},
+        {"material": "mineral_wool", "thickness": 0.08},
+    ]
+    building = building_with_data.copy(wall_layers=layers, floor={"layers": layers})
+    assert round(building.wall_thickness, 2) == 0.3
+    results = []
+    for mode in ("reference", "compiled"):
+        process = ThermalProcess(t_start=20, building=building, for_plots=["mass", "room"], mode=mode)
+        assert process.model.elements["wall"].count_layers == 4 + 10 + 16
+        results.append(process.run_process())
+    assert np.allclose(results[0][["mass", "room"]], results[1][["mass", "room"]], atol=1e-3)
+
+
+def test_periodic_cycle(building_with_data):
+    """Periodic cycle ends with the same temperatures as it begins and is the limit of repeated days."""
+    params = {"t_start": 20, "building": building_with_data, "for_plots": ["mass", "room"], "mode": "compiled"}
+    process = ThermalProcess(**params)
+    cycle = process.run_periodic()
+    first = cycle.iloc[0]
+    assert abs(process.model.elements["mass"].temp - first["mass"]) < 1e-4
+    assert abs(process.model.elements["room"].temp - first["room"]) < 1e-4
+
+    process = ThermalProcess(method="exponential", **params)
+    process.model.make_init_conditions()
+    for day in range(60):
+        result = process.run_chunk(dt=3600)
+    assert np.allclose(result[["mass", "room"]], cycle[["mass", "room"]], atol=1e-2)
+
+
+def test_periodic_cycle_of_day(building_with_data):
+    """Closing point of a day is not an interval of the period of periodic cycle."""
+    params = {"t_start": 20, "for_plots": ["mass", "room"], "mode": "compiled"}
+    cycle = ThermalProcess(building=building_with_data, **params).run_periodic()
+    building = building_with_data.copy()
+    closing = building.weather_data.index[-1] + pd.Timedelta("1h")
+    building.weather_data = pd.concat([building.weather_data, building.weather_data.iloc[:1].set_axis([closing])])
+    building.power_data = pd.concat([building.power_data, building.power_data.iloc[:1].set_axis([closing])])
+    process = ThermalProcess(building=building, **params)
+    assert process.get_count_period() == 24
+    day = process.run_periodic()
+    assert len(day) == 25
+    assert np.allclose(day[["mass", "room"]][:24], cycle[["mass", "room"]])
+    assert np.allclose(day[["mass", "room"]].iloc[-1], day[["mass", "room"]].iloc[0], atol=1e-4)
+
+
+def test_steady_state(building_with_data):
+    """Steady state is the limit of process with constant power and temperature of air."""
+    process = ThermalProcess(t_start=20, building=building_with_data, method="exponential")
+    steady = process.run_steady(power=200, t_out=-10)
+    process.model.make_init_conditions()
+    process.model.start(count=1, dt=1e8, power=200, t_out=-10)
+    assert abs(process.model.elements["mass"].temp - steady["mass"]) < 1e-3
+    assert abs(process.model.elements["room"].temp - steady["room"]) < 1e-3
+
+
+def test_checkpoint(building_with_data, tmpdir):
+    """Process resumed from checkpoint gives the same temperatures as one process."""
+    params = {"t_start": 20, "for_plots": ["mass", "room"], "mode": "compiled"}
+    expected = ThermalProcess(building=building_with_data, **params).run_process()
+    first = building_with_data.copy()
+    first.power_data = building_with_data.power_data.iloc[:12]
+    first.weather_data = building_with_data.weather_data.iloc[:12]
+    process = ThermalProcess(building=first, **params)
+    process.run_process()
+    file_path = str(tmpdir.join("state.npz"))
+    save_checkpoint(process.model, file_path, time=first.power_data.index[-1])
+    assert get_checkpoint_time(file_path) == first.power_data.index[-1]
+
+    second = building_with_data.copy()
+    second.power_data = building_with_data.power_data.iloc[12:]
+    second.weather_data = building_with_data.weather_data.iloc[12:]
+    process = ThermalProcess(building=second, **params)
+    process.model.make_init_conditions()
+    load_checkpoint(process.model, file_path)
+    result = process.run_chunk()
+    assert result.equals(expected.iloc[12:])
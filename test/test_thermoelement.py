@@ -1,4 +1,8 @@
-from solarhouse.thermal_element import ThermalElement
+import doctest
+
+import numpy as np
+
+from solarhouse.thermal_element import FrozenThermalElement, ThermalElement
 
 
 def test_cube_water():
@@ -67,3 +71,81 @@ def test_thin_layer():
     """Example element which implementing  thin layer between two areas."""
     e = ThermalElement(name="glass", temp0=20.0, area_inside=1.0, input_alpha=23,)
     assert e.calc_loss_input_q(25.0) == 115.0
+
+
+def test_vectorized_wall_as_loop():
+    """
+    Vectorized layer solver gives the same temperatures as loop by dx
+    for wall with variable area and with branch of loss.
+    """
+    walls = []
+    for vectorized in (False, True):
+        e = ThermalElement(
+            name="birch_wall",
+            temp0=20.0,
+            density=700.0,
+            heat_capacity=1250.0,
+            dx=0.01,
+            thickness=0.20,
+            kappa=0.15,
+            area_inside=1.0,
+            area_outside=1.5,
+            by_average=False,
+            vectorized=vectorized,
+        )
+        e.branches_loss = [ThermalElement(name="outside", temp0=-5.0, area_inside=1.5, input_alpha=25.0)]
+        for i in range(100):
+            e.compute(1000, 3)
+        walls.append(e)
+    assert walls[0].dTx_list == walls[1].dTx_list
+    assert walls[0].temp == walls[1].temp
+
+
+def test_vectorized_loss_and_temp_of_dx():
+    """Loss and temperature of dx of element computed by layer solver are read and written in the solver."""
+    params = {
+        "name": "birch_wall",
+        "temp0": 20.0,
+        "density": 700.0,
+        "heat_capacity": 1250.0,
+        "dx": 0.01,
+        "thickness": 0.20,
+        "kappa": 0.15,
+        "area_inside": 1.0,
+        "area_outside": 1.1,
+    }
+    for cls in (ThermalElement, FrozenThermalElement):
+        walls = [cls(vectorized=vectorized, **params) for vectorized in (False, True)]
+        for e in walls:
+            e.compute(1000, 1)
+        assert walls[1].solver is not None
+        assert round(walls[1].get_loss_dx(0), 3) == round(walls[0].get_loss_dx(0), 3) == 1.714
+        for e in walls:
+            e.calc_temp(100.0, 0.0, 1, 1)
+        assert np.allclose(walls[0].dTx_list, walls[1].dTx_list)
+
+
+def test_frozen_element_doctests():
+    """Frozen element passes examples of ThermalElement as drop-in replacement."""
+    globs = {"ThermalElement": FrozenThermalElement}
+    parser = doctest.DocTestParser()
+    test = parser.get_doctest(ThermalElement.__doc__, globs, "ThermalElement", None, 0)
+    runner = doctest.DocTestRunner()
+    runner.run(test)
+    assert runner.failures == 0
+    assert runner.tries > 10
+
+
+def test_layers_of_one_material():
+    """Wall of layers of one material is the same as homogeneous wall."""
+    params = {"name": "birch_wall", "temp0": 20.0, "area_inside": 1.0, "area_outside": 1.1}
+    birch = {"density": 700.0, "heat_capacity": 1250.0, "kappa": 0.15}
+    wall = ThermalElement(dx=0.01, thickness=0.2, vectorized=True, **birch, **params)
+    layers = [dict(thickness=0.05, dx=0.01, **birch), dict(thickness=0.15, dx=0.01, **birch)]
+    layered = ThermalElement(layers=layers, **params)
+    assert layered.count_layers == wall.count_layers
+    assert round(layered.density, 6) == 700.0
+    for i in range(100):
+        wall.compute(1000, 1)
+        layered.compute(1000, 1)
+    assert np.allclose(wall.dTx_list, layered.dTx_list)
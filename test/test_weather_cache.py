@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from solarhouse.weather_cache import WeatherCache
+
+
+class Fetcher:
+    """Local stand-in of model of weather forecast."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, latitude, longitude, start, end):
+        self.count += 1
+        index = pd.date_range(start=start, end=end, freq="1h")
+        return pd.DataFrame({"ghi": 100.0, "dni": 50.0, "dhi": 50.0, "temp_air": -5.0}, index=index)
+
+
+start = pd.Timestamp("2019-12-22", tz="Asia/Novosibirsk")
+end = start + pd.Timedelta(days=1)
+
+
+def test_cache(tmpdir):
+    fetcher = Fetcher()
+    cache = WeatherCache(str(tmpdir), fetcher=fetcher)
+    data = cache.get(54.84, 83.26, start, end)
+    assert fetcher.count == 1
+    assert cache.get(54.84, 83.26, start, end).equals(data)
+    assert fetcher.count == 1
+    cache.get(54.84, 83.26, start, end, model="NAM")
+    cache.get(55.0, 83.26, start, end)
+    assert fetcher.count == 3
+
+
+def test_ttl(tmpdir):
+    fetcher = Fetcher()
+    cache = WeatherCache(str(tmpdir), ttl=-1, fetcher=fetcher)
+    cache.get(54.84, 83.26, start, end)
+    cache.get(54.84, 83.26, start, end)
+    assert fetcher.count == 2
+
+
+def test_max_size(tmpdir):
+    fetcher = Fetcher()
+    cache = WeatherCache(str(tmpdir), max_size=1, fetcher=fetcher)
+    cache.get(54.84, 83.26, start, end)
+    cache.get(55.0, 83.26, start, end)
+    assert not cache.has(54.84, 83.26, start, end)
+    assert cache.has(55.0, 83.26, start, end)
+
+
+def test_offline(tmpdir):
+    fetcher = Fetcher()
+    cache = WeatherCache(str(tmpdir), ttl=-1, fetcher=fetcher)
+    data = cache.get(54.84, 83.26, start, end)
+    cache.offline = True
+    assert cache.get(54.84, 83.26, start, end).equals(data)
+    with pytest.raises(Exception):
+        cache.get(55.0, 83.26, start, end)
+    assert fetcher.count == 1